@@ -1,10 +1,19 @@
+from loguru import logger
 from fastapi import APIRouter, HTTPException, status
 from dishka.integrations.fastapi import FromDishka, DishkaRoute
 
+from app.core.cache import Cache
+from app.services import Services
 from app.core.config import settings
 from app.repositories import Repositories
+from app.api.dependencies import invalidate_principal
 from app.schemas.auth import LoginRequest, AuthResponse, RegisterRequest
-from app.core.security import verify_password, create_access_token, hash_password
+from app.core.security import (
+    hash_password,
+    verify_password,
+    create_access_token,
+    password_needs_rehash,
+)
 
 router = APIRouter(prefix="/auth", route_class=DishkaRoute)
 
@@ -12,6 +21,8 @@ router = APIRouter(prefix="/auth", route_class=DishkaRoute)
 @router.post("/login", response_model=AuthResponse)
 async def login(
     request: LoginRequest,
+    cache: FromDishka[Cache],
+    services: FromDishka[Services],
     repositories: FromDishka[Repositories],
 ):
     """"""
@@ -31,6 +42,19 @@ async def login(
             detail="Incorrect credentials"
         )
 
+    if password_needs_rehash(hashed=db_user.hashed_password):
+        # best effort, a busy hashing pool must not reject a verified login, next one retries
+        try:
+            new_hashed = await hash_password(password=request.password)
+        except HTTPException as e:
+            if e.status_code != status.HTTP_503_SERVICE_UNAVAILABLE:
+                raise
+            logger.warning(f"Password rehash of user {db_user.id} postponed, hashing pool is busy")
+        else:
+            # also bumps updated_at, so cached profiles and principals are dropped as after any change
+            await services.users().update(_id=db_user.id, values={"hashed_password": new_hashed})
+            await invalidate_principal(user_id=db_user.id, cache=cache)
+
     token = await create_access_token(
         payload={'sub': db_user.id},
         minutes=settings.access_token_expire_minutes
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Header
 from dishka.integrations.fastapi import FromDishka, DishkaRoute
 
+from app.services import Services
 from app.schemas.users import UserDTO
 from app.repositories import Repositories
 from app.schemas.mixins import ResponseItems
-from app.api.dependencies import get_current_user
+from app.utils.responses import (
+    to_public,
+    make_etag,
+    is_not_modified,
+    conditional_response,
+    not_modified_response,
+)
+from app.api.dependencies import get_current_user, get_optional_user
 from app.schemas.comments import CommentUpdateRequest, CommentPublic
 
 router = APIRouter(prefix="/comments", route_class=DishkaRoute)
@@ -17,10 +25,13 @@ async def get_all(
     limit: int | None = None,
     offset: int | None = None,
     post_id: int | None = None,
+    current_user: UserDTO | None = Depends(get_optional_user),
+    if_none_match: str | None = Header(default=None),
 ):
-    """"""
+    """Answers 304 when the page did not change since If-None-Match"""
 
-    comments, count = await repositories.comments().get_all(
+    reader = repositories.read(user_id=current_user.id if current_user else None)
+    comments, count, count_exact = await reader.comments().get_all(
         q=q,
         limit=limit,
         offset=offset,
@@ -32,21 +43,58 @@ async def get_all(
         sorters=[{"order": "desc", "field": "created_at"}],
     )
 
-    return {"items": comments, "count": count}
+    return conditional_response(
+        ResponseItems[CommentPublic].model_construct(
+            count=count,
+            count_exact=count_exact,
+            items=[to_public(CommentPublic, comment) for comment in comments],
+            next_cursor=None,
+        ),
+        if_none_match=if_none_match,
+    )
 
 
 @router.get("/{_id}", response_model=CommentPublic)
-async def get_by_id(_id: int, repositories: FromDishka[Repositories]):
-    """"""
+async def get_by_id(
+    _id: int,
+    repositories: FromDishka[Repositories],
+    current_user: UserDTO | None = Depends(get_optional_user),
+    if_none_match: str | None = Header(default=None),
+    if_modified_since: str | None = Header(default=None),
+):
+    """Conditional, 304 is answered from `get_version` without loading the comment"""
 
-    comment_db = await repositories.comments().get_by_id(_id=_id)
+    reader = repositories.read(user_id=current_user.id if current_user else None)
+    version = await reader.comments().get_version(_id=_id)
+    if not version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Post with id={_id} is not found"
+        )
+
+    etag = make_etag("comments", _id, *version)
+    last_modified = max(version)
+    if is_not_modified(
+        etag=etag,
+        if_none_match=if_none_match,
+        last_modified=last_modified,
+        if_modified_since=if_modified_since,
+    ):
+        return not_modified_response(etag=etag, last_modified=last_modified)
+
+    comment_db = await reader.comments().get_by_id(_id=_id)
     if not comment_db:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Post with id={_id} is not found"
         )
 
-    return comment_db
+    return conditional_response(
+        to_public(CommentPublic, comment_db),
+        if_none_match=None,
+        etag=etag,
+        last_modified=last_modified,
+    )
 
 
 @router.patch("/{_id}", response_model=CommentPublic)
@@ -83,6 +131,7 @@ async def update(
 @router.delete("/{_id}", response_model=CommentPublic)
 async def delete(
     _id: int,
+    services: FromDishka[Services],
     repositories: FromDishka[Repositories],
     current_user: UserDTO = Depends(get_current_user),
 ):
@@ -101,6 +150,6 @@ async def delete(
             detail="You have no access to this resourse"
         )
 
-    await repositories.comments().delete(_id=_id)
+    await services.comments().delete(comment=comment_db)
 
     return comment_db
@@ -1,25 +1,143 @@
-from typing import AsyncGenerator
+import time
+from collections import OrderedDict
 
+from loguru import logger
 from jwt.exceptions import PyJWTError
 from fastapi import Depends, HTTPException, status, Header
+from dishka.integrations.fastapi import FromDishka, inject
 
-from app.ioc import AppContainer, Scope
+from app.core.cache import Cache
+from app.schemas.users import UserDTO
+from app.core.config import settings
+from app.core.metrics import PRINCIPAL_CACHE_REQUESTS, PRINCIPAL_CACHE_SIZE
 from app.repositories import Repositories
 from app.core.security import decode_access_token, JWTBearer
 
+PRINCIPAL_INVALIDATION_CHANNEL = "principal:invalidate"
 
-async def get_repositories() -> AsyncGenerator[Repositories, None]:
-    """"""
 
-    async with AppContainer(scope=Scope.REQUEST) as container:
-        yield await container.get(Repositories)
+class PrincipalCache:
+    """Bounded LRU cache with TTL of authenticated users, local to the worker"""
 
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: OrderedDict[tuple[int, str], tuple[float, UserDTO]] = OrderedDict()
+        self._tokens: dict[int, set[str]] = {}
 
+    def get(self, user_id: int, token: str) -> UserDTO | None:
+        """"""
+
+        item = self._items.get((user_id, token))
+        if item is None or item[0] <= time.monotonic():
+            if item is not None:
+                self._remove(user_id=user_id, token=token)
+            PRINCIPAL_CACHE_REQUESTS.labels(result="miss").inc()
+            return None
+
+        self._items.move_to_end((user_id, token))
+        PRINCIPAL_CACHE_REQUESTS.labels(result="hit").inc()
+
+        return item[1]
+
+    def set(self, user_id: int, token: str, user: UserDTO):
+        """"""
+
+        self._items[(user_id, token)] = (time.monotonic() + self.ttl, user)
+        self._items.move_to_end((user_id, token))
+        self._tokens.setdefault(user_id, set()).add(token)
+
+        while len(self._items) > self.max_size:
+            (oldest_user_id, oldest_token), _ = self._items.popitem(last=False)
+            self._discard_token(user_id=oldest_user_id, token=oldest_token)
+
+        PRINCIPAL_CACHE_SIZE.set(len(self._items))
+
+    def invalidate(self, user_id: int):
+        """Drops cached user for all of its tokens"""
+
+        for token in self._tokens.pop(user_id, set()):
+            self._items.pop((user_id, token), None)
+
+        PRINCIPAL_CACHE_SIZE.set(len(self._items))
+
+    def clear(self):
+        """"""
+
+        self._items.clear()
+        self._tokens.clear()
+        PRINCIPAL_CACHE_SIZE.set(0)
+
+    def _remove(self, user_id: int, token: str):
+        self._items.pop((user_id, token), None)
+        self._discard_token(user_id=user_id, token=token)
+        PRINCIPAL_CACHE_SIZE.set(len(self._items))
+
+    def _discard_token(self, user_id: int, token: str):
+        tokens = self._tokens.get(user_id)
+        if tokens is None:
+            return
+
+        tokens.discard(token)
+        if not tokens:
+            del self._tokens[user_id]
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl,
+)
+
+
+def on_principal_invalidation(message: str | None):
+    """Handler of invalidations published by other workers"""
+
+    if message is None:
+        # subscription was interrupted, some invalidations might be lost
+        principal_cache.clear()
+        return
+
+    try:
+        user_id = int(message)
+    except ValueError:
+        logger.error(f"Malformed principal invalidation message: {message!r}")
+        return
+
+    principal_cache.invalidate(user_id=user_id)
+
+
+async def invalidate_principal(user_id: int, cache: Cache):
+    """Must be called after any change of the user's row"""
+
+    principal_cache.invalidate(user_id=user_id)
+    await cache.publish(PRINCIPAL_INVALIDATION_CHANNEL, str(user_id))
+
+
+async def get_user_by_token(
+    user_id: int,
+    token: str,
+    repositories: Repositories,
+) -> UserDTO | None:
+    """Also binds user to the request session, so its commits make reads sticky"""
+
+    user = principal_cache.get(user_id=user_id, token=token)
+    if user is None:
+        user = await repositories.users().get_by_id(_id=user_id)
+        if user is not None:
+            principal_cache.set(user_id=user_id, token=token, user=user)
+
+    if user is not None:
+        repositories.session.info["user_id"] = user.id
+
+    return user
+
+
+@inject
 async def get_optional_user(
+    repositories: FromDishka[Repositories],
     authorization: str | None = Header(default=None),
-    repositories: Repositories = Depends(get_repositories),
 ):
-    """"""
+    """Resolved from the request container, so shares session with the route"""
 
     if not authorization:
         return None
@@ -36,16 +154,21 @@ async def get_optional_user(
     if not user_id:
         return None
 
-    user = await repositories.users().get_by_id(_id=int(user_id))
+    user = await get_user_by_token(
+        user_id=int(user_id),
+        token=token,
+        repositories=repositories,
+    )
     if not user:
         return None
 
     return user
 
 
+@inject
 async def get_current_user(
+    repositories: FromDishka[Repositories],
     token: str = Depends(JWTBearer()),
-    repositories: Repositories = Depends(get_repositories)
 ):
     """Decodes JWT token and extracts user from db"""
 
@@ -61,8 +184,12 @@ async def get_current_user(
     if not user_id:
         raise cred_exception
 
-    user = await repositories.users().get_by_id(_id=int(user_id))
+    user = await get_user_by_token(
+        user_id=int(user_id),
+        token=token,
+        repositories=repositories,
+    )
     if not user:
-        return cred_exception
+        raise cred_exception
 
     return user
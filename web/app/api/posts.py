@@ -1,53 +1,149 @@
+from pydantic import BaseModel, ValidationError
 from dishka.integrations.fastapi import FromDishka, DishkaRoute
-from fastapi import APIRouter, HTTPException, status, Query, Depends
+from fastapi import APIRouter, HTTPException, status, Query, Depends, Header
 
 from app.services import Services
+from app.core.config import settings
+from app.schemas.posts import PostDTO, PostListPublic
+from app.utils.responses import to_public, public_response, make_etag, conditional_response
+from app.tasks.likes import record_like
 from app.db.models import UsersModel
 from app.repositories import Repositories
-from app.schemas.mixins import ResponseItems
+from app.schemas.tags import TagPublic
+from app.schemas.mixins import ResponseItems, BatchRequest, BatchResponse, BatchItemResult
+from app.repositories.utils import get_next_cursor
 from app.api.dependencies import get_current_user, get_optional_user
 from app.schemas.posts import PostCreateRequest, PostUpdateRequest, PostPublic
-from app.schemas.comments import CommentCreateRequest, CommentPublic, CommentUpdateRequest
+from app.schemas.comments import (
+    CommentUser,
+    CommentPost,
+    CommentPublic,
+    PostCommentsPage,
+    CommentCreateRequest,
+    CommentUpdateRequest,
+)
 
 router = APIRouter(prefix="/posts", route_class=DishkaRoute)
 
 
+def validate_batch[T: BaseModel](
+    schema: type[T],
+    request: BatchRequest,
+) -> tuple[dict[int, T], dict[int, list[dict]]]:
+    """Validates batch items one by one
+
+        :return: valid items and errors of invalid ones, both by index
+
+    """
+
+    if len(request.items) > settings.max_batch_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch can contain at most {settings.max_batch_size} items",
+        )
+
+    valid, errors = {}, {}
+    for index, item in enumerate(request.items):
+        try:
+            valid[index] = schema.model_validate(item)
+        except ValidationError as e:
+            errors[index] = e.errors(include_url=False, include_context=False)
+
+    return valid, errors
+
+
+def batch_response[T: BaseModel](
+    schema: type[T],
+    created: dict[int, BaseModel],
+    errors: dict[int, list[dict]],
+) -> BatchResponse[T]:
+    """Per item results in the order of request items"""
+
+    results = [
+        BatchItemResult[schema].model_construct(index=index, ok=True, item=to_public(schema, dto), errors=None)
+        for index, dto in created.items()
+    ] + [
+        BatchItemResult[schema].model_construct(index=index, ok=False, item=None, errors=item_errors)
+        for index, item_errors in errors.items()
+    ]
+
+    return BatchResponse[schema].model_construct(
+        created=len(created),
+        items=sorted(results, key=lambda result: result.index),
+    )
+
+
 @router.get("/")
 async def get_all(
     services: FromDishka[Services],
     q: str | None = None,
     limit: int | None = None,
     offset: int | None = None,
+    cursor: str | None = None,
+    highlight: bool = False,
     author_id: int | None = None,
     current_user: UsersModel | None = Depends(get_optional_user),
     tags: list[str] = Query(None, alias="tags"),
-) -> ResponseItems[PostPublic]:
-    """"""
+    if_none_match: str | None = Header(default=None),
+) -> ResponseItems[PostListPublic]:
+    """`q` runs full-text search over title and text, ordered by relevance
+
+    Answers 304 when the page did not change since If-None-Match.
+    """
+
+    sorters = [{"field": "id", "order": "desc"}]
+
+    try:
+        posts, count, count_exact = await services.posts().get_all(
+            q=q,
+            tags=tags,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            sorters=sorters,
+            highlight=highlight,
+            filters=[{
+                "field": "user_id",
+                "val": author_id,
+                "operation": "eq",
+            }] if author_id else None,
+            user_id=current_user.id if current_user else None,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            detail=str(e),
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
 
-    posts, count = await services.posts().get_all(
-        q=q,
-        tags=tags,
-        limit=limit,
-        offset=offset,
-        sorters=[{"field": "id", "order": "desc"}],
-        filters=[{
-            "field": "user_id",
-            "val": author_id,
-            "operation": "eq",
-        }] if author_id else None,
-        user_id=current_user.id if current_user else None,
+    return conditional_response(
+        ResponseItems[PostListPublic].model_construct(
+            count=count,
+            items=[to_public(PostListPublic, post) for post in posts],
+            count_exact=count_exact,
+            next_cursor=get_next_cursor(items=posts, sorters=sorters, limit=limit) if q is None else None,
+        ),
+        if_none_match=if_none_match,
+        # is_liked differs between users
+        vary="Authorization",
     )
 
-    return ResponseItems(count=count, items=posts)
-
 
-@router.get("/tags")
-async def get_all_tags(repositories: FromDishka[Repositories]):
-    """"""
+@router.get("/tags", response_model=ResponseItems[TagPublic])
+async def get_all_tags(
+    repositories: FromDishka[Repositories],
+    limit: int | None = None,
+    offset: int | None = None,
+    current_user: UsersModel | None = Depends(get_optional_user),
+):
+    """Tags with number of posts using them, most popular first"""
 
-    tags = await repositories.posts().get_all_tags()
+    reader = repositories.read(user_id=current_user.id if current_user else None)
+    tags, count, count_exact = await reader.posts().get_all_tags(
+        limit=limit,
+        offset=offset,
+    )
 
-    return {"tags": tags}
+    return {"items": tags, "count": count, "count_exact": count_exact}
 
 
 @router.get("/{_id}", response_model=PostPublic)
@@ -55,8 +151,13 @@ async def get_by_id(
     _id: int,
     services: FromDishka[Services],
     current_user: UsersModel | None = Depends(get_optional_user),
+    if_none_match: str | None = Header(default=None),
 ):
-    """"""
+    """Conditional, the cached post is its own cheap version lookup
+
+    Counters change without updated_at, so there is no Last-Modified,
+    only the ETag covers them.
+    """
 
     post_db = await services.posts().get_by_id(
         _id=_id,
@@ -68,7 +169,20 @@ async def get_by_id(
             detail=f"Post with id={_id} is not found"
         )
 
-    return post_db
+    return conditional_response(
+        to_public(PostPublic, post_db),
+        if_none_match=if_none_match,
+        etag=make_etag(
+            "posts",
+            post_db.id,
+            post_db.updated_at,
+            post_db.likes_count,
+            post_db.comments_count,
+            post_db.author.updated_at,
+            post_db.is_liked,
+        ),
+        vary="Authorization",
+    )
 
 
 @router.post("/", response_model=PostPublic)
@@ -87,6 +201,30 @@ async def create_post(
     )
 
 
+@router.post("/batch", response_model=BatchResponse[PostPublic])
+async def create_posts(
+    request: BatchRequest,
+    services: FromDishka[Services],
+    current_user: UsersModel = Depends(get_current_user),
+):
+    """Creates up to `settings.max_batch_size` posts in one transaction
+
+    Items are validated as `PostCreateRequest` one by one, invalid ones
+    are reported with their errors and the rest are created.
+    """
+
+    valid, errors = validate_batch(PostCreateRequest, request)
+
+    posts = await services.posts().create_many(
+        user_id=current_user.id,
+        items=[item.model_dump() for item in valid.values()],
+    )
+
+    return public_response(
+        batch_response(PostPublic, created=dict(zip(valid, posts)), errors=errors)
+    )
+
+
 @router.patch("/{_id}", response_model=PostPublic)
 async def update(
     _id: int,
@@ -146,90 +284,121 @@ async def delete(
     return post_db
 
 
+async def enqueue_like(post: PostDTO, user_id: int, liked: bool) -> PostDTO:
+    """Queues like for the batch writer, returns post with optimistic count
+
+    Queued even when is_liked already matches: it does not see intents still
+    buffered, so skipping could let an earlier opposite intent win.
+    Repeated intents are idempotent in LikesBuffer and apply_likes.
+    """
+
+    await record_like.kiq(post_id=post.id, user_id=user_id, liked=liked)
+    if post.is_liked == liked:
+        return post
+
+    return post.model_copy(update={
+        "is_liked": liked,
+        "likes_count": max(post.likes_count + (1 if liked else -1), 0),
+    })
+
+
 @router.post("/{_id}/like", response_model=PostPublic)
 async def like_post(
     _id: int,
     services: FromDishka[Services],
-    repositories: FromDishka[Repositories],
     current_user: UsersModel = Depends(get_current_user),
 ):
-    """"""
+    """Idempotent, liking already liked post returns it unchanged"""
 
-    like = await repositories.posts().get_like(
-        post_id=_id,
-        user_id=current_user.id,
-    )
+    if settings.likes_write_behind:
+        post = await services.posts().get_by_id(_id=_id, user_id=current_user.id)
+        if post:
+            post = await enqueue_like(post=post, user_id=current_user.id, liked=True)
+    else:
+        post = await services.posts().like(_id=_id, user_id=current_user.id)
 
-    if like is not None:
+    if not post:
         raise HTTPException(
-            detail="You have already liked this post",
-            status_code=status.HTTP_400_BAD_REQUEST,
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Post with id={_id} is not found"
         )
 
-    await repositories.posts().like(post_id=_id, user_id=current_user.id)
-
-    return await services.posts().get_by_id(_id=_id, user_id=current_user.id)
+    return post
 
 
 @router.delete("/{_id}/like")
 async def dislike_post(
     _id: int,
     services: FromDishka[Services],
-    repositories: FromDishka[Repositories],
     current_user: UsersModel = Depends(get_current_user),
 ):
-    """"""
+    """Idempotent, removing absent like returns post unchanged"""
 
-    like = await repositories.posts().get_like(
-        post_id=_id,
-        user_id=current_user.id,
-    )
+    if settings.likes_write_behind:
+        post = await services.posts().get_by_id(_id=_id, user_id=current_user.id)
+        if post:
+            post = await enqueue_like(post=post, user_id=current_user.id, liked=False)
+    else:
+        post = await services.posts().dislike(_id=_id, user_id=current_user.id)
 
-    if not like:
+    if not post:
         raise HTTPException(
-            detail="You haven't like this post yet to delete it",
-            status_code=status.HTTP_400_BAD_REQUEST,
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Post with id={_id} is not found"
         )
 
-    await repositories.posts().dislike(post_id=_id, user_id=current_user.id)
-
-    return await services.posts().get_by_id(_id=_id, user_id=current_user.id)
+    return post
 
 
-@router.get("/{_id}/comments", response_model=ResponseItems[CommentPublic])
+@router.get("/{_id}/comments", response_model=PostCommentsPage)
 async def get_comments(
     _id: int,
     limit: int,
     offset: int,
+    services: FromDishka[Services],
     repositories: FromDishka[Repositories],
+    current_user: UsersModel | None = Depends(get_optional_user),
+    if_none_match: str | None = Header(default=None),
 ):
-    """"""
+    """Answers 304 when the page did not change since If-None-Match"""
 
-    post = await repositories.posts().get_by_id(_id=_id)
+    post = await services.posts().get_by_id(_id=_id, user_id=None)
     if not post:
         raise HTTPException(
             detail=f"Post with id={_id} does not exist",
             status_code=status.HTTP_404_NOT_FOUND,
         )
 
-    comments, count = await repositories.comments().get_all(
+    reader = repositories.read(user_id=current_user.id if current_user else None)
+    comments, count, count_exact = await reader.comments().get_all_for_post(
+        post_id=_id,
         limit=limit,
         offset=offset,
         sorters=[{"field": "created_at", "order": "desc"}],
-        filters=[{
-            "operation": "eq",
-            "field": "post_id",
-            "val": _id,
-        }],
     )
 
-    return {"items": comments, "count": count}
+    return conditional_response(
+        PostCommentsPage.model_construct(
+            count=count,
+            count_exact=count_exact,
+            items=comments,
+            post=CommentPost.model_construct(
+                id=post.id,
+                user_id=post.user_id,
+                created_at=post.created_at,
+                updated_at=post.updated_at,
+                author=to_public(CommentUser, post.author),
+            ),
+        ),
+        if_none_match=if_none_match,
+    )
 
 
 @router.post("/{_id}/comments", response_model=CommentPublic)
 async def create_comment(
     _id: int,
     request: CommentCreateRequest,
+    services: FromDishka[Services],
     repositories: FromDishka[Repositories],
     current_user: UsersModel = Depends(get_current_user),
 ):
@@ -242,13 +411,43 @@ async def create_comment(
             status_code=status.HTTP_404_NOT_FOUND,
         )
 
-    return await repositories.comments().create(
+    return await services.comments().create(
         post_id=post.id,
         text=request.text,
         user_id=current_user.id,
     )
 
 
+@router.post("/{_id}/comments/batch", response_model=BatchResponse[CommentPublic])
+async def create_comments(
+    _id: int,
+    request: BatchRequest,
+    services: FromDishka[Services],
+    repositories: FromDishka[Repositories],
+    current_user: UsersModel = Depends(get_current_user),
+):
+    """Creates up to `settings.max_batch_size` comments in one transaction, see `create_posts`"""
+
+    post = await repositories.posts().get_by_id(_id=_id)
+    if not post:
+        raise HTTPException(
+            detail=f"Post with id={_id} does not exist",
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+    valid, errors = validate_batch(CommentCreateRequest, request)
+
+    comments = await services.comments().create_many(
+        post_id=post.id,
+        texts=[item.text for item in valid.values()],
+        user_id=current_user.id,
+    )
+
+    return public_response(
+        batch_response(CommentPublic, created=dict(zip(valid, comments)), errors=errors)
+    )
+
+
 @router.patch("/{_id}/comments/{comment_id}", response_model=CommentPublic)
 async def update_comment(
     _id: int,
@@ -291,6 +490,7 @@ async def update_comment(
 async def delete_comment(
     _id: int,
     comment_id: int,
+    services: FromDishka[Services],
     repositories: FromDishka[Repositories],
     current_user: UsersModel = Depends(get_current_user),
 ):
@@ -316,6 +516,6 @@ async def delete_comment(
             detail="You can update only your comments"
         )
 
-    await repositories.comments().delete(_id=comment_id)
+    await services.comments().delete(comment=comment)
 
     return comment
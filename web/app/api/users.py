@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Header
 from dishka.integrations.fastapi import FromDishka, DishkaRoute
 
+from app.core.cache import Cache
+from app.services import Services
 from app.db.models import UsersModel
 from app.repositories import Repositories
-from app.api.dependencies import get_current_user
+from app.utils.responses import make_etag, conditional_response
+from app.api.dependencies import get_current_user, invalidate_principal
 from app.core.security import verify_password, hash_password
 from app.schemas.users import UserPublic, UserUpdate, PasswordUpdate
 
@@ -21,15 +24,18 @@ async def get_me(current_user: UsersModel = Depends(get_current_user)):
 @router.patch("/me", response_model=UserPublic)
 async def update_me(
     request: UserUpdate,
+    cache: FromDishka[Cache],
+    services: FromDishka[Services],
     repositories: FromDishka[Repositories],
     current_user: UsersModel = Depends(get_current_user)
 ):
     """"""
 
-    await repositories.users().update(
+    await services.users().update(
         _id=current_user.id,
         values=request.model_dump(exclude_unset=True)
     )
+    await invalidate_principal(user_id=current_user.id, cache=cache)
 
     return await repositories.users().get_by_id(_id=current_user.id)
 
@@ -37,6 +43,8 @@ async def update_me(
 @router.post("/me/password", response_model=UserPublic)
 async def change_password(
     request: PasswordUpdate,
+    cache: FromDishka[Cache],
+    services: FromDishka[Services],
     repositories: FromDishka[Repositories],
     current_user: UsersModel = Depends(get_current_user)
 ):
@@ -61,12 +69,13 @@ async def change_password(
 
     new_hashed = await hash_password(password=request.new_password)
 
-    await repositories.users().update(
+    await services.users().update(
         _id=current_user.id,
         values={
             "hashed_password": new_hashed,
         }
     )
+    await invalidate_principal(user_id=current_user.id, cache=cache)
 
     return await repositories.users().get_by_id(_id=current_user.id)
 
@@ -74,8 +83,23 @@ async def change_password(
 @router.get("/{user_id}", response_model=UserPublic)
 async def get_by_id(
     user_id: int,
-    repositories: FromDishka[Repositories]
+    services: FromDishka[Services],
+    if_none_match: str | None = Header(default=None),
+    if_modified_since: str | None = Header(default=None),
 ):
-    """"""
+    """Conditional, the cached profile is its own cheap version lookup"""
 
-    return await repositories.users().get_by_id(_id=user_id)
+    user = await services.users().get_by_id(_id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id={user_id} is not found"
+        )
+
+    return conditional_response(
+        user,
+        if_none_match=if_none_match,
+        etag=make_etag("users", user.id, user.updated_at),
+        last_modified=user.updated_at,
+        if_modified_since=if_modified_since,
+    )
@@ -0,0 +1,34 @@
+import asyncio
+
+from loguru import logger
+from dishka import make_async_container, Scope
+
+from app.ioc import AppProvider
+from app.repositories import Repositories
+
+
+async def reconcile_counters():
+    """Repairs denormalized counters which drifted from their source tables
+
+    Usage: `uv run python -m app.commands.counters`
+    """
+
+    app_container = make_async_container(AppProvider())
+
+    async with app_container(scope=Scope.REQUEST) as container:
+        repositories = await container.get(Repositories)
+
+        fixed = await repositories.posts().reconcile_likes_count()
+        logger.info(f"posts.likes_count: {fixed} rows fixed")
+
+        fixed = await repositories.comments().reconcile_comments_count()
+        logger.info(f"posts.comments_count: {fixed} rows fixed")
+
+        fixed = await repositories.tags().reconcile()
+        logger.info(f"tags.posts_count: {fixed} rows fixed")
+
+    await app_container.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(reconcile_counters())
@@ -0,0 +1,485 @@
+import csv
+import json
+import time
+import asyncio
+import argparse
+import itertools
+from pathlib import Path
+from datetime import datetime, UTC
+from typing import Awaitable, Callable, Iterator
+
+import asyncpg
+from loguru import logger
+from dishka import make_async_container
+
+from app.ioc import AppProvider
+from app.core.cache import Cache
+from app.core.config import settings
+from app.services.posts import PostsService
+from app.utils.functions import utcnow, make_excerpt
+
+# separator of tags in CSV input, NDJSON has them as a list
+CSV_TAGS_SEPARATOR = "|"
+
+
+def parse_datetime(value: str | None) -> datetime | None:
+    """ISO 8601 to naive UTC, as stored by the app"""
+
+    if not value:
+        return None
+
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(UTC).replace(tzinfo=None)
+
+    return parsed
+
+
+def parse_tags(value: str | list | None) -> list[str]:
+    if not value:
+        return []
+
+    if isinstance(value, str):
+        value = value.split(CSV_TAGS_SEPARATOR)
+
+    # unique, as a post counts once per tag in the catalog
+    return list(dict.fromkeys(tag.strip() for tag in value if tag.strip()))
+
+
+def parse_user(record: dict) -> tuple:
+    return (
+        str(record["external_id"]),
+        record["email"],
+        record["name"],
+        record["hashed_password"],
+        parse_datetime(record.get("created_at")),
+    )
+
+
+def parse_post(record: dict) -> tuple:
+    return (
+        str(record["external_id"]),
+        str(record["user_external_id"]),
+        record["title"],
+        record["text"],
+        make_excerpt(record["text"]),
+        parse_tags(record.get("tags")),
+        parse_datetime(record.get("created_at")),
+    )
+
+
+def parse_comment(record: dict) -> tuple:
+    return (
+        str(record["external_id"]),
+        str(record["user_external_id"]),
+        str(record["post_external_id"]),
+        record["text"],
+        parse_datetime(record.get("created_at")),
+    )
+
+
+def parse_like(record: dict) -> tuple:
+    return (
+        str(record["user_external_id"]),
+        str(record["post_external_id"]),
+        parse_datetime(record.get("created_at")),
+    )
+
+
+# rows already imported and in-batch duplicates are dropped,
+# so replaying a batch after a crash does not duplicate anything
+DEDUPLICATE_STAGING = (
+    """
+    DELETE FROM {staging} AS s
+    USING import_ids AS m
+    WHERE m.entity = '{entity}' AND m.external_id = s.external_id
+    """,
+    """
+    DELETE FROM {staging} AS a
+    USING {staging} AS b
+    WHERE a.external_id = b.external_id AND a.ctid > b.ctid
+    """,
+)
+
+
+def resolve(staging: str, column: str, entity: str, reference: str) -> str:
+    """Fills column with id of the entity row imported with external id in reference column"""
+
+    return f"""
+        UPDATE {staging} AS s
+        SET {column} = m.id
+        FROM import_ids AS m
+        WHERE m.entity = '{entity}' AND m.external_id = s.{reference}
+    """
+
+
+async def drop_unresolved(connection: asyncpg.Connection, staging: str, *columns: str) -> int:
+    """Removes rows whose references were not imported, returns their number"""
+
+    condition = " OR ".join(f"{column} IS NULL" for column in columns)
+    status = await connection.execute(f"DELETE FROM {staging} WHERE {condition}")
+
+    return int(status.split()[-1])
+
+
+async def apply_users(connection: asyncpg.Connection, now_: datetime) -> tuple[int, int]:
+    """Inserts users with new emails, already registered emails are linked instead"""
+
+    for statement in DEDUPLICATE_STAGING:
+        await connection.execute(statement.format(staging="staging_users", entity="users"))
+
+    status = await connection.execute(
+        """
+        INSERT INTO users (created_at, updated_at, email, name, hashed_password)
+        SELECT DISTINCT ON (email)
+            coalesce(created_at, $1), coalesce(created_at, $1), email, name, hashed_password
+        FROM staging_users AS s
+        WHERE NOT EXISTS (SELECT 1 FROM users AS u WHERE u.email = s.email)
+        ORDER BY email, ctid
+        """,
+        now_,
+    )
+    await connection.execute(
+        """
+        INSERT INTO import_ids (entity, external_id, id)
+        SELECT 'users', s.external_id, u.id
+        FROM staging_users AS s
+        JOIN users AS u ON u.email = s.email
+        """
+    )
+
+    return int(status.split()[-1]), 0
+
+
+async def apply_posts(connection: asyncpg.Connection, now_: datetime) -> tuple[int, int]:
+    """Inserts posts and adds them to tags catalog"""
+
+    for statement in DEDUPLICATE_STAGING:
+        await connection.execute(statement.format(staging="staging_posts", entity="posts"))
+
+    await connection.execute(
+        resolve(staging="staging_posts", column="user_id", entity="users", reference="user_external_id")
+    )
+    skipped = await drop_unresolved(connection, "staging_posts", "user_id")
+
+    status = await connection.execute(
+        """
+        UPDATE staging_posts SET id = nextval(pg_get_serial_sequence('posts', 'id'))
+        """
+    )
+    await connection.execute(
+        """
+        INSERT INTO posts (id, created_at, updated_at, title, text, excerpt, tags, user_id)
+        SELECT id, coalesce(created_at, $1), coalesce(created_at, $1), title, text, excerpt, tags, user_id
+        FROM staging_posts
+        """,
+        now_,
+    )
+    await connection.execute(
+        "INSERT INTO import_ids (entity, external_id, id) SELECT 'posts', external_id, id FROM staging_posts"
+    )
+    await connection.execute(
+        """
+        INSERT INTO tags (name, posts_count)
+        SELECT tag, count(*)
+        FROM staging_posts, unnest(staging_posts.tags) AS tag
+        GROUP BY tag
+        ON CONFLICT (name) DO UPDATE
+        SET posts_count = tags.posts_count + excluded.posts_count
+        """
+    )
+
+    return int(status.split()[-1]), skipped
+
+
+async def apply_comments(connection: asyncpg.Connection, now_: datetime) -> tuple[int, int]:
+    """Inserts comments and increments posts.comments_count"""
+
+    for statement in DEDUPLICATE_STAGING:
+        await connection.execute(statement.format(staging="staging_comments", entity="comments"))
+
+    await connection.execute(
+        resolve(staging="staging_comments", column="user_id", entity="users", reference="user_external_id")
+    )
+    await connection.execute(
+        resolve(staging="staging_comments", column="post_id", entity="posts", reference="post_external_id")
+    )
+    skipped = await drop_unresolved(connection, "staging_comments", "user_id", "post_id")
+
+    status = await connection.execute(
+        """
+        UPDATE staging_comments SET id = nextval(pg_get_serial_sequence('comments', 'id'))
+        """
+    )
+    await connection.execute(
+        """
+        INSERT INTO comments (id, created_at, updated_at, text, user_id, post_id)
+        SELECT id, coalesce(created_at, $1), coalesce(created_at, $1), text, user_id, post_id
+        FROM staging_comments
+        """,
+        now_,
+    )
+    await connection.execute(
+        "INSERT INTO import_ids (entity, external_id, id) SELECT 'comments', external_id, id FROM staging_comments"
+    )
+    await connection.execute(
+        """
+        UPDATE posts
+        SET comments_count = posts.comments_count + added.count
+        FROM (SELECT post_id, count(*) AS count FROM staging_comments GROUP BY post_id) AS added
+        WHERE posts.id = added.post_id
+        """
+    )
+
+    return int(status.split()[-1]), skipped
+
+
+async def apply_likes(connection: asyncpg.Connection, now_: datetime) -> tuple[int, int]:
+    """Inserts new likes and increments posts.likes_count by them"""
+
+    await connection.execute(
+        resolve(staging="staging_likes", column="user_id", entity="users", reference="user_external_id")
+    )
+    await connection.execute(
+        resolve(staging="staging_likes", column="post_id", entity="posts", reference="post_external_id")
+    )
+    skipped = await drop_unresolved(connection, "staging_likes", "user_id", "post_id")
+
+    added = await connection.fetch(
+        """
+        WITH inserted AS (
+            INSERT INTO likes (user_id, post_id, created_at)
+            SELECT DISTINCT ON (user_id, post_id) user_id, post_id, coalesce(created_at, $1)
+            FROM staging_likes
+            ON CONFLICT DO NOTHING
+            RETURNING post_id
+        )
+        UPDATE posts
+        SET likes_count = posts.likes_count + added.count
+        FROM (SELECT post_id, count(*) AS count FROM inserted GROUP BY post_id) AS added
+        WHERE posts.id = added.post_id
+        RETURNING added.count
+        """,
+        now_,
+    )
+
+    return sum(row["count"] for row in added), skipped
+
+
+class Entity:
+    def __init__(
+        self,
+        name: str,
+        staging: str,
+        columns: tuple[str, ...],
+        parse: Callable[[dict], tuple],
+        apply: Callable[[asyncpg.Connection, datetime], Awaitable[tuple[int, int]]],
+        changed_posts: str | None = None,
+    ):
+        self.name = name
+        self.staging = staging
+        self.columns = columns
+        self.parse = parse
+        self.apply = apply
+        # ids of existing posts whose counters the batch changed, their cached copies are invalidated
+        self.changed_posts = changed_posts
+
+
+# import in this order, references are resolved through import_ids
+ENTITIES = {
+    "users": Entity(
+        name="users",
+        staging="""
+            CREATE TEMP TABLE staging_users (
+                external_id varchar(128), email varchar(128), name varchar(64),
+                hashed_password varchar(256), created_at timestamp
+            )
+        """,
+        columns=("external_id", "email", "name", "hashed_password", "created_at"),
+        parse=parse_user,
+        apply=apply_users,
+    ),
+    "posts": Entity(
+        name="posts",
+        staging="""
+            CREATE TEMP TABLE staging_posts (
+                external_id varchar(128), user_external_id varchar(128), title varchar, text varchar,
+                excerpt varchar, tags varchar(64)[], created_at timestamp, user_id integer, id integer
+            )
+        """,
+        columns=("external_id", "user_external_id", "title", "text", "excerpt", "tags", "created_at"),
+        parse=parse_post,
+        apply=apply_posts,
+    ),
+    "comments": Entity(
+        name="comments",
+        staging="""
+            CREATE TEMP TABLE staging_comments (
+                external_id varchar(128), user_external_id varchar(128), post_external_id varchar(128),
+                text varchar, created_at timestamp, user_id integer, post_id integer, id integer
+            )
+        """,
+        columns=("external_id", "user_external_id", "post_external_id", "text", "created_at"),
+        parse=parse_comment,
+        apply=apply_comments,
+        changed_posts="SELECT DISTINCT post_id FROM staging_comments",
+    ),
+    "likes": Entity(
+        name="likes",
+        staging="""
+            CREATE TEMP TABLE staging_likes (
+                user_external_id varchar(128), post_external_id varchar(128),
+                created_at timestamp, user_id integer, post_id integer
+            )
+        """,
+        columns=("user_external_id", "post_external_id", "created_at"),
+        parse=parse_like,
+        apply=apply_likes,
+        changed_posts="SELECT DISTINCT post_id FROM staging_likes",
+    ),
+}
+
+
+def read_records(path: Path) -> Iterator[dict]:
+    """Streams records of a .csv file with header or of NDJSON otherwise"""
+
+    with path.open(newline="", encoding="utf-8") as source:
+        if path.suffix.lower() == ".csv":
+            yield from csv.DictReader(source)
+            return
+
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Checkpoint:
+    """Number of input records committed, stored next to the input file"""
+
+    def __init__(self, path: Path, entity: str):
+        self.path = path
+        self.entity = entity
+        self.records = 0
+        self.imported = 0
+        self.skipped = 0
+
+    def load(self):
+        if not self.path.exists():
+            return
+
+        state = json.loads(self.path.read_text())
+        if state["entity"] != self.entity:
+            raise ValueError(f"Checkpoint {self.path} belongs to {state['entity']} import")
+
+        self.records, self.imported, self.skipped = state["records"], state["imported"], state["skipped"]
+
+    def save(self):
+        temporary = self.path.with_suffix(".tmp")
+        temporary.write_text(json.dumps({
+            "entity": self.entity,
+            "records": self.records,
+            "imported": self.imported,
+            "skipped": self.skipped,
+        }))
+        temporary.replace(self.path)
+
+
+async def import_file(entity: Entity, path: Path, batch_size: int, restart: bool = False):
+    """Copies records into a staging table and moves them into the app tables
+
+    Every batch is one transaction which also updates tags catalog and
+    counters, progress is saved to `<path>.checkpoint` after each of them.
+    Cached posts with changed counters are invalidated after the commit.
+    Total counts cached by web workers catch up within COUNT_CACHE_TTL,
+    and without CACHE_URL their in-process caches are out of reach and
+    catch up within CACHE_TTL.
+    """
+
+    checkpoint = Checkpoint(path=path.with_name(f"{path.name}.checkpoint"), entity=entity.name)
+    if not restart:
+        checkpoint.load()
+    if checkpoint.records:
+        logger.info(f"{entity.name}: resuming after {checkpoint.records} records")
+
+    records = itertools.islice(read_records(path), checkpoint.records, None)
+
+    container = make_async_container(AppProvider())
+    cache = await container.get(Cache)
+    connection = await asyncpg.connect(settings.postgresql_url)
+    try:
+        await connection.execute(entity.staging)
+        started_at = time.perf_counter()
+        imported = 0
+
+        for batch in itertools.batched(records, batch_size):
+            batch_started_at = time.perf_counter()
+
+            async with connection.transaction():
+                await connection.execute(f"TRUNCATE staging_{entity.name}")
+                await connection.copy_records_to_table(
+                    f"staging_{entity.name}",
+                    records=[entity.parse(record) for record in batch],
+                    columns=entity.columns,
+                )
+                inserted, skipped = await entity.apply(connection, utcnow())
+                changed = await connection.fetch(entity.changed_posts) if entity.changed_posts else []
+
+            if changed:
+                await cache.invalidate(*[PostsService.cache_key(row["post_id"]) for row in changed])
+
+            imported += len(batch)
+            checkpoint.records += len(batch)
+            checkpoint.imported += inserted
+            checkpoint.skipped += skipped
+            checkpoint.save()
+
+            elapsed = time.perf_counter() - batch_started_at
+            logger.info(
+                f"{entity.name}: {checkpoint.records} records, {inserted} inserted, {skipped} unresolved, "
+                f"{len(batch) / elapsed:.0f} rows/s"
+            )
+
+        elapsed = time.perf_counter() - started_at
+        logger.info(
+            f"{entity.name}: done, {checkpoint.imported} inserted, {checkpoint.skipped} unresolved, "
+            f"{imported / elapsed if elapsed else 0:.0f} rows/s over {elapsed:.1f}s"
+        )
+    finally:
+        await connection.close()
+        await container.close()
+
+
+def main():
+    """Bulk import of content from other platforms
+
+    Usage: `uv run python -m app.commands.imports posts posts.ndjson [--batch-size 10000]`
+
+    Records reference each other by their ids on the source platform,
+    so import users, then posts, then comments and likes:
+        users: external_id, email, name, hashed_password (bcrypt), created_at
+        posts: external_id, user_external_id, title, text, tags, created_at
+        comments: external_id, user_external_id, post_external_id, text, created_at
+        likes: user_external_id, post_external_id, created_at
+    created_at is optional ISO 8601, CSV tags are separated by "|".
+    Records referencing rows which were not imported are counted as unresolved and skipped.
+    """
+
+    parser = argparse.ArgumentParser(description="Bulk import of NDJSON or CSV files")
+    parser.add_argument("entity", choices=list(ENTITIES))
+    parser.add_argument("path", type=Path, help=".csv with header or NDJSON")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--restart", action="store_true", help="ignore saved checkpoint")
+    args = parser.parse_args()
+
+    asyncio.run(
+        import_file(
+            entity=ENTITIES[args.entity],
+            path=args.path,
+            batch_size=args.batch_size,
+            restart=args.restart,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
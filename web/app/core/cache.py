@@ -0,0 +1,234 @@
+import time
+import asyncio
+from collections import OrderedDict
+from typing import AsyncGenerator, Awaitable, Callable, Protocol
+
+from loguru import logger
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> bytes | str | None: ...
+
+    async def set(self, key: str, value: str, ttl: int): ...
+
+    async def delete(self, *keys: str): ...
+
+    async def publish(self, channel: str, message: str): ...
+
+
+class RedisBackend:
+    def __init__(self, client: Redis):
+        self.client = client
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: int):
+        await self.client.set(key, value, ex=ttl)
+
+    async def delete(self, *keys: str):
+        await self.client.delete(*keys)
+
+    async def publish(self, channel: str, message: str):
+        await self.client.publish(channel, message)
+
+
+class MemoryBackend:
+    """In-process stand-in for Redis, used when CACHE_URL is not set
+
+    Bounded LRU, expired entries are swept at most once per `sweep_interval`
+    seconds on writes, besides being dropped when read.
+    """
+
+    def __init__(self, max_size: int, sweep_interval: float = 60.0):
+        self.max_size = max_size
+        self.sweep_interval = sweep_interval
+        self.values: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    async def get(self, key: str) -> str | None:
+        item = self.values.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self.values.pop(key, None)
+            return None
+
+        self.values.move_to_end(key)
+
+        return value
+
+    async def set(self, key: str, value: str, ttl: int):
+        now_ = time.monotonic()
+        if now_ >= self._next_sweep:
+            self._sweep(now_=now_)
+
+        self.values[key] = (now_ + ttl, value)
+        self.values.move_to_end(key)
+
+        while len(self.values) > self.max_size:
+            self.values.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def _sweep(self, now_: float):
+        for key in [key for key, (expires_at, _) in self.values.items() if expires_at <= now_]:
+            del self.values[key]
+
+        self._next_sweep = now_ + self.sweep_interval
+
+    async def publish(self, channel: str, message: str):
+        # single process, nobody else to notify
+        pass
+
+
+class Cache:
+    """Read-through cache of pydantic DTOs
+
+    Concurrent misses of the same key within a worker share a single load,
+    made by the first request with its own loader and finished within its
+    scope. Cache errors never fail the request and fall back to the loader.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self._flights: dict[str, asyncio.Future] = {}
+        # bumped on invalidation of a key being loaded, so the load is not stored,
+        # kept only while the flight is pending
+        self._generations: dict[str, int] = {}
+
+    async def get_or_load[T: BaseModel](
+        self,
+        key: str,
+        schema: type[T],
+        loader: Callable[[], Awaitable[T | None]],
+    ) -> T | None:
+        """"""
+
+        try:
+            raw = await self.backend.get(key)
+        except RedisError as e:
+            logger.warning(f"Cache get failed for {key}: {e}")
+            return await loader()
+
+        if raw is not None:
+            return schema.model_validate_json(raw)
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._load(key=key, loader=loader))
+            self._flights[key] = flight
+            flight.add_done_callback(lambda _: self._land(key=key))
+
+            # loader runs on the owner's request session, so the flight must not outlive
+            # the owner: cancelling the owner cancels the flight
+            return await flight
+
+        try:
+            return await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling() or not flight.cancelled():
+                raise
+
+        # owner was cancelled, load on our own session, not stored as it is no flight
+        return await loader()
+
+    def _land(self, key: str):
+        self._flights.pop(key, None)
+        self._generations.pop(key, None)
+
+    async def _load[T: BaseModel](
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[T | None]],
+    ) -> T | None:
+        """"""
+
+        generation = self._generations.get(key, 0)
+
+        value = await loader()
+        if value is None or self._generations.get(key, 0) != generation:
+            return value
+
+        try:
+            await self.backend.set(key, value.model_dump_json(), ttl=self.ttl)
+        except RedisError as e:
+            logger.warning(f"Cache set failed for {key}: {e}")
+
+        return value
+
+    async def invalidate(self, *keys: str):
+        """"""
+
+        for key in keys:
+            if key in self._flights:
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+        try:
+            await self.backend.delete(*keys)
+        except RedisError as e:
+            logger.warning(f"Cache invalidation failed for {keys}: {e}")
+
+    async def publish(self, channel: str, message: str):
+        """Notifies other workers, see `CacheManager.subscribe`"""
+
+        try:
+            await self.backend.publish(channel, message)
+        except RedisError as e:
+            logger.warning(f"Cache publish failed for {channel}: {e}")
+
+
+class CacheManager:
+    @classmethod
+    async def create_cache(cls) -> AsyncGenerator[Cache, None]:
+        if not settings.cache_url:
+            logger.debug("CACHE_URL is not set, using in-memory cache")
+            yield Cache(backend=MemoryBackend(max_size=settings.cache_memory_max_size), ttl=settings.cache_ttl)
+            return
+
+        logger.debug("Initializing Redis cache")
+        client = Redis.from_url(settings.cache_url)
+        try:
+            yield Cache(backend=RedisBackend(client=client), ttl=settings.cache_ttl)
+        finally:
+            await client.aclose()
+            logger.debug("Redis cache has been cleaned up")
+
+    @classmethod
+    async def subscribe(cls, channel: str, handler: Callable[[str | None], None]):
+        """Calls handler for every message published to channel until cancelled
+
+        On connection loss handler receives None, meaning that
+        messages might have been missed.
+        """
+
+        while True:
+            client = Redis.from_url(settings.cache_url, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(channel)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        handler(message["data"])
+                    except Exception as e:
+                        # one bad message must not end the subscription
+                        logger.exception(f"Handler of {channel} failed on {message['data']!r}: {e}")
+            except RedisError as e:
+                logger.warning(f"Subscription to {channel} lost: {e}")
+                handler(None)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
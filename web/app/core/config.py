@@ -1,4 +1,5 @@
 import os
+from typing import Literal
 
 from sqlalchemy import URL
 from pydantic import computed_field
@@ -10,22 +11,78 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = 30
     secret_key: str = os.getenv('SECRET_KEY')
 
+    # PASSWORD HASHING
+    bcrypt_rounds: int = os.getenv("BCRYPT_ROUNDS", 12)
+    password_hashing_workers: int = os.getenv("PASSWORD_HASHING_WORKERS", 2)
+    # hashes allowed to wait for a worker before answering 503
+    password_hashing_queue: int = os.getenv("PASSWORD_HASHING_QUEUE", 16)
+
     pg_host: str = os.getenv("POSTGRES_HOST")
     pg_port: int = os.getenv("POSTGRES_PORT")
     pg_user: str = os.getenv("POSTGRES_USER")
     pg_pass: str = os.getenv("POSTGRES_PASSWORD")
     database: str = os.getenv("POSTGRES_DB")
 
+    # CONNECTION POOL
+    # uvicorn reads the same variable as default for --workers
+    web_concurrency: int = os.getenv("WEB_CONCURRENCY", 1)
+    # taken from `SHOW max_connections` when not set
+    pg_max_connections: int | None = os.getenv("POSTGRES_MAX_CONNECTIONS")
+    # kept free for migrations, commands and admin sessions
+    pg_reserved_connections: int = os.getenv("POSTGRES_RESERVED_CONNECTIONS", 10)
+    pg_pool_timeout: int = os.getenv("POSTGRES_POOL_TIMEOUT", 30)
+    # pool of the taskiq worker process, taken out of the budget before it is split between web workers
+    pg_worker_connections: int = os.getenv("POSTGRES_WORKER_CONNECTIONS", 5)
+
+    # READ REPLICAS: comma separated postgresql+asyncpg:// urls
+    pg_replica_urls: str | None = os.getenv("POSTGRES_REPLICA_URLS")
+    # replicas lagging more seconds than this are skipped until they catch up
+    pg_replica_max_lag: float = os.getenv("POSTGRES_REPLICA_MAX_LAG", 5.0)
+    pg_replica_check_interval: float = os.getenv("POSTGRES_REPLICA_CHECK_INTERVAL", 2.0)
+    # user's reads go to the primary for this many seconds after own write
+    read_your_writes_window: float = os.getenv("READ_YOUR_WRITES_WINDOW", 10.0)
+
+    # QUERY DIAGNOSTICS: off | warn | raise, raise is meant for tests
+    query_budget_mode: Literal["off", "warn", "raise"] = os.getenv("QUERY_BUDGET_MODE", "off")
+    # statements allowed per request
+    query_budget: int = os.getenv("QUERY_BUDGET", 10)
+    # executions of the same statement reported as possible N+1
+    query_repeat_limit: int = os.getenv("QUERY_REPEAT_LIMIT", 3)
+
     logger_level: str = os.getenv("LOGGER_LEVEL")
     logger_filename: str = os.getenv("LOGGER_FILENAME")
 
     # BACKGROUND TASKS
     cache_url: str = os.getenv("CACHE_URL")
+    cache_ttl: int = os.getenv("CACHE_TTL", 60)
+    # entries kept by the in-process cache used without CACHE_URL
+    cache_memory_max_size: int = os.getenv("CACHE_MEMORY_MAX_SIZE", 10_000)
+    principal_cache_size: int = os.getenv("PRINCIPAL_CACHE_SIZE", 10_000)
+    principal_cache_ttl: int = os.getenv("PRINCIPAL_CACHE_TTL", 30)
     broker_url: str = os.getenv("BROKER_URL")
     backend_url: str = os.getenv("BACKEND_URL")
 
+    # likes are acknowledged at once and written by the worker in batches
+    likes_write_behind: bool = os.getenv("LIKES_WRITE_BEHIND", False)
+    likes_batch_size: int = os.getenv("LIKES_BATCH_SIZE", 500)
+    likes_flush_interval: float = os.getenv("LIKES_FLUSH_INTERVAL", 1.0)
+
     rate_limiter_url: str = os.getenv("RATE_LIMITER_URL")
 
+    # PAGINATION
+    default_page_size: int = os.getenv("DEFAULT_PAGE_SIZE", 20)
+    max_page_size: int = os.getenv("MAX_PAGE_SIZE", 100)
+
+    # BATCH WRITES: items accepted by one batch create request
+    max_batch_size: int = os.getenv("MAX_BATCH_SIZE", 100)
+
+    # TOTAL COUNTS: exact | cached | estimated
+    count_strategy: Literal["exact", "cached", "estimated"] = os.getenv("COUNT_STRATEGY", "exact")
+    count_cache_ttl: int = os.getenv("COUNT_CACHE_TTL", 30)
+    count_estimate_threshold: int = os.getenv("COUNT_ESTIMATE_THRESHOLD", 100_000)
+    # page and count fetching: sequential | window | concurrent
+    list_fetch_mode: Literal["sequential", "window", "concurrent"] = os.getenv("LIST_FETCH_MODE", "sequential")
+
     # SMTP
     smtp_port: int = os.getenv("SMTP_PORT")
     smtp_user: str = os.getenv('SMTP_USER')
@@ -57,5 +114,10 @@ class Settings(BaseSettings):
             database=self.database,
         ).render_as_string(hide_password=False)
 
+    @computed_field
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in (self.pg_replica_urls or "").split(",") if url.strip()]
+
 
 settings = Settings()
\ No newline at end of file
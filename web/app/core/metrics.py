@@ -0,0 +1,189 @@
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+from app.core.queries import record_query
+from app.utils.functions import get_route_template
+from prometheus_client import (
+    Gauge,
+    Counter,
+    Histogram,
+    CollectorRegistry,
+    REGISTRY,
+    CONTENT_TYPE_LATEST,
+    generate_latest,
+    multiprocess,
+)
+
+# with PROMETHEUS_MULTIPROC_DIR set every uvicorn worker writes its samples
+# there and /metrics aggregates them, the directory must be emptied on start
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+BCRYPT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+JWT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005)
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ["method", "route", "status"],
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections checked out of the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections opened above pool_size, negative while pool is not filled",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time to get a connection from the pool",
+    ["pool"],
+    buckets=DB_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time",
+    ["pool", "operation"],
+    buckets=DB_BUCKETS,
+)
+
+PASSWORD_HASHING_DURATION = Histogram(
+    "password_hashing_duration_seconds",
+    "bcrypt time including wait for a hashing thread",
+    ["operation"],
+    buckets=BCRYPT_BUCKETS,
+)
+PRINCIPAL_CACHE_REQUESTS = Counter(
+    "principal_cache_requests_total",
+    "Lookups of authenticated users in the worker's principal cache",
+    ["result"],
+)
+PRINCIPAL_CACHE_SIZE = Gauge(
+    "principal_cache_size",
+    "Users cached by the principal cache",
+    multiprocess_mode="livesum",
+)
+
+JWT_DURATION = Histogram(
+    "jwt_duration_seconds",
+    "JWT encoding and decoding time",
+    ["operation"],
+    buckets=JWT_BUCKETS,
+)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool observing how long checkouts wait, see `instrument_engine`"""
+
+    metrics_name = "primary"
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(self.metrics_name).observe(time.perf_counter() - started_at)
+
+
+def instrument_engine(engine: AsyncEngine, name: str):
+    """Reports pool state and statement durations of engine labelled with name
+
+    Statements are also counted for the current request, see `QueryStatsMiddleware`.
+    """
+
+    pool = engine.sync_engine.pool
+    if isinstance(pool, TimedQueuePool):
+        pool.metrics_name = name
+
+    def update_pool_gauges(*_):
+        DB_POOL_CHECKED_OUT.labels(name).set(pool.checkedout())
+        DB_POOL_OVERFLOW.labels(name).set(pool.overflow())
+
+    event.listen(pool, "checkout", update_pool_gauges)
+    event.listen(pool, "checkin", update_pool_gauges)
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_started_at"].pop()
+        record_query(statement=statement, duration=duration)
+
+        operation = statement.lstrip()[:6].upper()
+        if operation.startswith("WITH"):
+            operation = "WITH"
+        DB_QUERY_DURATION.labels(
+            name,
+            operation if operation in SQL_OPERATIONS else "OTHER",
+        ).observe(duration)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None and context.connection.info.get("query_started_at"):
+            context.connection.info["query_started_at"].pop()
+
+
+class MetricsMiddleware:
+    """Counts and times requests by route template, so ids do not explode cardinality"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            labels = (scope["method"], get_route_template(scope), str(status_code))
+            HTTP_REQUESTS.labels(*labels).inc()
+            HTTP_REQUEST_DURATION.labels(*labels).observe(time.perf_counter() - started_at)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """"""
+
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead():
+    """Drops live gauges of exiting worker from the multiprocess directory"""
+
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,117 @@
+import time
+from enum import Enum
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from loguru import logger
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
+
+from app.core.config import settings
+from app.utils.functions import get_route_template
+
+_current_stats: ContextVar["QueryStats | None"] = ContextVar("query_stats", default=None)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class QueryBudgetMode(str, Enum):
+    off = "off"
+    warn = "warn"
+    # for tests, the error reaches the test client after the response is sent
+    raise_ = "raise"
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+    # statement with placeholders -> times executed
+    shapes: Counter = field(default_factory=Counter)
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries"'
+
+    def get_violations(self, budget: int, repeat_limit: int) -> list[str]:
+        """"""
+
+        violations = []
+        if self.count > budget:
+            violations.append(f"{self.count} queries, budget is {budget}")
+
+        for statement, times in self.shapes.most_common():
+            if times < repeat_limit:
+                break
+            violations.append(f"same statement {times} times, possible N+1: {' '.join(statement.split())[:200]}")
+
+        return violations
+
+
+def record_query(statement: str, duration: float):
+    """Called by engine hooks for every executed statement, see `instrument_engine`"""
+
+    stats = _current_stats.get()
+    if stats is None:
+        return
+
+    stats.count += 1
+    stats.duration += duration
+    stats.shapes[statement] += 1
+
+
+class QueryStatsMiddleware:
+    """Counts statements and DB time of every request
+
+    Totals are sent in `Server-Timing` header and logged, with
+    `settings.query_budget_mode` routes exceeding `settings.query_budget`
+    or repeating a statement `settings.query_repeat_limit` times are reported.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        started_at = time.perf_counter()
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+
+        route = f"{scope['method']} {get_route_template(scope)}"
+        logger.debug(
+            f"{route}: {stats.count} queries, db {stats.duration * 1000:.1f}ms, "
+            f"total {(time.perf_counter() - started_at) * 1000:.1f}ms"
+        )
+
+        mode = QueryBudgetMode(settings.query_budget_mode)
+        if mode == QueryBudgetMode.off:
+            return
+
+        violations = stats.get_violations(
+            budget=settings.query_budget,
+            repeat_limit=settings.query_repeat_limit,
+        )
+        if not violations:
+            return
+
+        if mode == QueryBudgetMode.raise_:
+            raise QueryBudgetExceeded(f"{route}: " + "; ".join(violations))
+
+        for violation in violations:
+            logger.warning(f"{route}: {violation}")
@@ -1,4 +1,7 @@
+import asyncio
+from typing import Callable
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 import jwt
 import bcrypt
@@ -6,24 +9,77 @@ from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.core.config import settings
+from app.core.metrics import PASSWORD_HASHING_DURATION, JWT_DURATION
+
+
+class HashingPool:
+    """Runs bcrypt in threads, rejecting work beyond the queue limit with 503"""
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="bcrypt",
+        )
+        self.limit = max_workers + max_queue
+        self.pending = 0
+
+    async def run[T](self, func: Callable[..., T], *args) -> T:
+        """"""
+
+        if self.pending >= self.limit:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, try again later",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+
+hashing_pool = HashingPool(
+    max_workers=settings.password_hashing_workers,
+    max_queue=settings.password_hashing_queue,
+)
 
 
 async def hash_password(password: str) -> str:
     """Async wrapper for bcrypt operation"""
 
-    return bcrypt.hashpw(
-        password.encode('utf-8'),
-        bcrypt.gensalt()
-    ).decode('utf-8')
+    with PASSWORD_HASHING_DURATION.labels("hash").time():
+        hashed = await hashing_pool.run(
+            bcrypt.hashpw,
+            password.encode('utf-8'),
+            bcrypt.gensalt(rounds=settings.bcrypt_rounds),
+        )
+
+    return hashed.decode('utf-8')
 
 
 async def verify_password(password: str, hashed: str) -> bool:
     """"""
 
-    return bcrypt.checkpw(
-        password.encode("utf-8"),
-        hashed.encode("utf-8")
-    )
+    with PASSWORD_HASHING_DURATION.labels("verify").time():
+        return await hashing_pool.run(
+            bcrypt.checkpw,
+            password.encode("utf-8"),
+            hashed.encode("utf-8"),
+        )
+
+
+def password_needs_rehash(hashed: str) -> bool:
+    """True when hash was made with other cost than `settings.bcrypt_rounds`"""
+
+    # $2b$12$<salt and hash>
+    try:
+        rounds = int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+
+    return rounds != settings.bcrypt_rounds
 
 
 async def create_access_token(minutes: int, payload: dict) -> str:
@@ -34,21 +90,23 @@ async def create_access_token(minutes: int, payload: dict) -> str:
     exp = datetime.utcnow() + timedelta(minutes=minutes)
     to_encode.update({"exp": exp})
 
-    return jwt.encode(
-        payload=to_encode,
-        key=settings.secret_key,
-        algorithm=settings.algorithm
-    )
+    with JWT_DURATION.labels("encode").time():
+        return jwt.encode(
+            payload=to_encode,
+            key=settings.secret_key,
+            algorithm=settings.algorithm
+        )
 
 
 async def decode_access_token(token: str) -> dict:
     """"""
 
-    return jwt.decode(
-        jwt=token,
-        key=settings.secret_key,
-        algorithms=[settings.algorithm]
-    )
+    with JWT_DURATION.labels("decode").time():
+        return jwt.decode(
+            jwt=token,
+            key=settings.secret_key,
+            algorithms=[settings.algorithm]
+        )
 
 
 class JWTBearer(HTTPBearer):
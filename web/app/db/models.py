@@ -2,13 +2,16 @@ from typing import List
 from datetime import datetime
 
 import sqlalchemy as sa
-from sqlalchemy.dialects.postgresql import ARRAY
-from sqlalchemy.orm import Mapped, mapped_column, relationship, column_property
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import Mapped, mapped_column, relationship, query_expression
 from sqlalchemy import String, Index, text, ForeignKey, ColumnElement, Integer, type_coerce
 
 from app.db.resources import Base
 from app.utils.functions import utcnow
 
+# text search configuration used by posts.search_vector and search queries
+SEARCH_CONFIG = "english"
+
 
 class UsersModel(Base):
     __tablename__ = "users"
@@ -37,6 +40,11 @@ class UsersModel(Base):
 class LikesModel(Base):
     __tablename__ = "likes"
 
+    __table_args__ = (
+        # primary key starts with user_id, so counting by post needs its own index
+        Index("idx_likes__post_id", "post_id"),
+    )
+
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id"),
         primary_key=True,
@@ -56,8 +64,9 @@ class PostsModel(Base):
 
     __table_args__ = (
         Index(
-            "idx_posts__text__title",
-            *["text", "title"]
+            "idx_posts__search_vector",
+            "search_vector",
+            postgresql_using="gin",
         ),
     )
 
@@ -67,6 +76,8 @@ class PostsModel(Base):
 
     text: Mapped[str]
     title: Mapped[str]
+    # set from text by PostsRepository.create/update, shown in lists
+    excerpt: Mapped[str] = mapped_column(default="", server_default="")
     tags: Mapped[list[str]] = mapped_column(
         ARRAY(String(64)),
         nullable=False,
@@ -78,19 +89,58 @@ class PostsModel(Base):
         ),
         nullable=False,
     )
-    likes_count: Mapped[int] = column_property(
-        sa.select(sa.func.count(LikesModel.post_id))
-        .where(LikesModel.post_id == id)
-        .scalar_subquery()
+    # denormalized, maintained by PostsRepository.like/dislike
+    likes_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    # denormalized, maintained by CommentsRepository.create/delete
+    comments_count: Mapped[int] = mapped_column(default=0, server_default="0")
+
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        sa.Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(text, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
     )
+    # populated only by queries made on behalf of a user
+    is_liked: Mapped[bool | None] = query_expression()
+    # populated only by search queries
+    search_rank: Mapped[float | None] = query_expression()
+    search_headline: Mapped[str | None] = query_expression()
 
     author: Mapped["UsersModel"] = relationship(lazy="joined")
     likes: Mapped[List["LikesModel"]] = relationship()
 
 
+class TagsModel(Base):
+    __tablename__ = "tags"
+
+    __table_args__ = (
+        Index(
+            "idx_tags__posts_count__name",
+            text("posts_count DESC"),
+            "name",
+        ),
+    )
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # denormalized, maintained by PostsRepository.create/update/delete
+    posts_count: Mapped[int] = mapped_column(default=0, server_default="0")
+
+
 class CommentsModel(Base):
     __tablename__ = "comments"
 
+    __table_args__ = (
+        # post comments listing, newest first
+        Index(
+            "idx_comments__post_id__created_at",
+            "post_id",
+            text("created_at DESC"),
+        ),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     created_at: Mapped[datetime] = mapped_column(default=utcnow)
     updated_at: Mapped[datetime] = mapped_column(default=utcnow)
@@ -110,3 +160,12 @@ class CommentsModel(Base):
     author: Mapped["UsersModel"] = relationship(lazy="joined")
     post: Mapped["PostsModel"] = relationship(lazy="joined")
 
+
+class ImportIdsModel(Base):
+    """Ids of rows brought by `app.commands.imports`, by their id on the source platform"""
+
+    __tablename__ = "import_ids"
+
+    entity: Mapped[str] = mapped_column(String(16), primary_key=True)
+    external_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    id: Mapped[int]
@@ -0,0 +1,170 @@
+import time
+import asyncio
+import itertools
+from dataclasses import dataclass
+
+import sqlalchemy as sa
+from loguru import logger
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.cache import Cache
+
+REPLICA_STICKY_CHANNEL = "replicas:sticky"
+
+# zero when the replica has replayed everything it received,
+# otherwise time since the last replayed transaction
+REPLICA_LAG_QUERY = sa.text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+@dataclass
+class Replica:
+    engine: AsyncEngine
+    # seconds, None until checked or when the replica is unreachable
+    lag: float | None = None
+
+
+class ReplicaRouter:
+    """Chooses engine for read-only queries, local to the worker
+
+    Replicas lagging more than `max_lag` are skipped, users who
+    committed a write within `sticky_window` read from the primary.
+    """
+
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        cache: Cache,
+        max_lag: float,
+        sticky_window: float,
+    ):
+        self.replicas = [Replica(engine=engine) for engine in engines]
+        self.cache = cache
+        self.max_lag = max_lag
+        self.sticky_window = sticky_window
+        self._counter = itertools.count()
+        self._sticky: dict[int, float] = {}
+        self._primary_until = 0.0
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self, user_id: int | None = None) -> AsyncEngine | None:
+        """Returns replica engine to read from, None for the primary"""
+
+        if not self.replicas:
+            return None
+
+        now_ = time.monotonic()
+        if now_ < self._primary_until:
+            return None
+
+        if user_id is not None:
+            sticky_until = self._sticky.get(user_id)
+            if sticky_until is not None:
+                if now_ < sticky_until:
+                    return None
+                del self._sticky[user_id]
+
+        healthy = [r for r in self.replicas if r.lag is not None and r.lag <= self.max_lag]
+        if not healthy:
+            return None
+
+        return healthy[next(self._counter) % len(healthy)].engine
+
+    def stick(self, user_id: int):
+        """"""
+
+        self._sticky[user_id] = time.monotonic() + self.sticky_window
+
+    def mark_write(self, user_id: int):
+        """Routes user's reads to the primary in this and other workers"""
+
+        self.stick(user_id=user_id)
+
+        task = asyncio.get_running_loop().create_task(
+            self.cache.publish(REPLICA_STICKY_CHANNEL, str(user_id))
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def on_commit(self, session: Session):
+        """`after_commit` listener of request sessions, see `DatabaseManager.create_session`"""
+
+        # set by authentication, commits are only made by writes
+        user_id = session.info.get("user_id")
+        if user_id is not None:
+            self.mark_write(user_id=user_id)
+
+    def on_sticky_message(self, message: str | None):
+        """Handler of writes published by other workers"""
+
+        if message is None:
+            # subscription was interrupted, somebody's write might be missed
+            self._primary_until = time.monotonic() + self.sticky_window
+            return
+
+        self.stick(user_id=int(message))
+
+    async def check_lag(self):
+        """"""
+
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as connection:
+                    replica.lag = float(await connection.scalar(REPLICA_LAG_QUERY))
+            except (SQLAlchemyError, OSError) as e:
+                logger.warning(f"Replica {replica.engine.url.host} is unavailable: {e}")
+                replica.lag = None
+                continue
+
+            if replica.lag > self.max_lag:
+                logger.warning(f"Replica {replica.engine.url.host} lags {replica.lag:.1f}s, reading from primary")
+
+        now_ = time.monotonic()
+        for user_id in [k for k, until in self._sticky.items() if until <= now_]:
+            del self._sticky[user_id]
+
+    async def monitor(self, interval: float):
+        """Checks lag of replicas every interval seconds until cancelled"""
+
+        while True:
+            await self.check_lag()
+            await asyncio.sleep(interval)
+
+
+class ReplicaSessions:
+    """Replica session of a request, opened by the first read routed to a replica"""
+
+    def __init__(self, router: ReplicaRouter):
+        self.router = router
+        self.session: AsyncSession | None = None
+
+    def get(self, user_id: int | None = None) -> AsyncSession | None:
+        """Returns session to read from, None for the primary"""
+
+        engine = self.router.choose(user_id=user_id)
+        if engine is None:
+            return None
+
+        if self.session is None:
+            self.session = AsyncSession(engine, expire_on_commit=False, autoflush=False)
+
+        return self.session
+
+    async def close(self):
+        """"""
+
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
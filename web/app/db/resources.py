@@ -1,25 +1,90 @@
+import asyncio
 from typing import AsyncGenerator
+from contextlib import suppress
 
+import sqlalchemy as sa
 from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 
+from app.core.cache import Cache
 from app.core.config import settings
+from app.core.metrics import TimedQueuePool, instrument_engine
+from app.db.replicas import ReplicaRouter, ReplicaSessions
 
 Base = declarative_base()
 
 
 class DatabaseManager:
     @classmethod
-    async def create_sa_engine(cls) -> AsyncGenerator[AsyncEngine, None]:
-        logger.debug("Initializing SQLAlchemy engine")
+    async def get_max_connections(cls) -> int:
+        """`settings.pg_max_connections` or the server's `max_connections`"""
+
+        if settings.pg_max_connections:
+            return int(settings.pg_max_connections)
+
+        probe = create_async_engine(url=settings.async_postgresql_url, poolclass=NullPool)
+        try:
+            async with probe.connect() as connection:
+                return int(await connection.scalar(sa.text("SHOW max_connections")))
+        finally:
+            await probe.dispose()
+
+    @staticmethod
+    def split_pool(connections: int) -> tuple[int, int]:
+        """pool_size and max_overflow adding up to connections"""
+
+        connections = max(connections, 2)
+        pool_size = max(connections * 3 // 4, 1)
+
+        return pool_size, connections - pool_size
+
+    @classmethod
+    async def get_pool_limits(cls) -> tuple[int, int]:
+        """Splits connections budget between web workers, returns pool_size and max_overflow
+
+        Reserved connections and the taskiq worker's pool are taken out
+        first, the worker sizes its pool by `settings.pg_worker_connections`
+        alone. A replica gets the same split of its own max_connections,
+        which hot standby requires to be at least the primary's.
+        """
+
+        max_connections = await cls.get_max_connections()
+        budget = max_connections - settings.pg_reserved_connections - settings.pg_worker_connections
+
+        return cls.split_pool(budget // max(settings.web_concurrency, 1))
+
+    @classmethod
+    def create_pooled_engine(cls, url: str, pool_size: int, max_overflow: int, name: str) -> AsyncEngine:
+        """Engine reporting its pool and queries to metrics labelled with name"""
+
         engine = create_async_engine(
             future=True,
-            pool_size=35,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=settings.pg_pool_timeout,
+            poolclass=TimedQueuePool,
             json_serializer=lambda x: x,
+            url=url,
+        )
+        instrument_engine(engine=engine, name=name)
+
+        return engine
+
+    @classmethod
+    async def create_sa_engine(cls) -> AsyncGenerator[AsyncEngine, None]:
+        logger.debug("Initializing SQLAlchemy engine")
+        pool_size, max_overflow = await cls.get_pool_limits()
+        engine = cls.create_pooled_engine(
             url=settings.async_postgresql_url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            name="primary",
         )
-        logger.debug("SQLAlchemy engine has been initialized")
+        logger.debug(f"SQLAlchemy engine has been initialized: {pool_size=}, {max_overflow=}")
         try:
             yield engine
         finally:
@@ -27,9 +92,90 @@ class DatabaseManager:
             logger.debug("SQLAlchemy engine has been cleaned up")
 
     @classmethod
-    async def create_session(cls, engine: AsyncEngine) -> AsyncGenerator[AsyncSession, None]:
+    async def create_worker_sa_engine(cls) -> AsyncGenerator[AsyncEngine, None]:
+        """Engine of the taskiq worker, sized by `settings.pg_worker_connections`"""
+
+        pool_size, max_overflow = cls.split_pool(settings.pg_worker_connections)
+        engine = cls.create_pooled_engine(
+            url=settings.async_postgresql_url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            name="worker",
+        )
+        logger.debug(f"SQLAlchemy worker engine has been initialized: {pool_size=}, {max_overflow=}")
+        try:
+            yield engine
+        finally:
+            await engine.dispose()
+
+    @classmethod
+    def create_primary_only_router(cls, cache: Cache) -> ReplicaRouter:
+        """Router without replicas, for processes that only write"""
+
+        return ReplicaRouter(
+            cache=cache,
+            engines=[],
+            max_lag=settings.pg_replica_max_lag,
+            sticky_window=settings.read_your_writes_window,
+        )
+
+    @classmethod
+    async def create_replica_router(cls, cache: Cache) -> AsyncGenerator[ReplicaRouter, None]:
+        """Engines of `settings.replica_urls`, with pools sized as the primary's"""
+
+        engines = []
+        if settings.replica_urls:
+            pool_size, max_overflow = await cls.get_pool_limits()
+            engines = [
+                cls.create_pooled_engine(
+                    url=url,
+                    pool_size=pool_size,
+                    max_overflow=max_overflow,
+                    name=f"replica:{make_url(url).host}",
+                )
+                for url in settings.replica_urls
+            ]
+
+        router = ReplicaRouter(
+            cache=cache,
+            engines=engines,
+            max_lag=settings.pg_replica_max_lag,
+            sticky_window=settings.read_your_writes_window,
+        )
+        if not router.enabled:
+            yield router
+            return
+
+        logger.debug(f"Initializing {len(engines)} replica engines")
+        monitor = asyncio.create_task(router.monitor(interval=settings.pg_replica_check_interval))
+        try:
+            yield router
+        finally:
+            monitor.cancel()
+            with suppress(asyncio.CancelledError):
+                await monitor
+            for engine in engines:
+                await engine.dispose()
+            logger.debug("Replica engines have been cleaned up")
+
+    @classmethod
+    async def create_session(
+        cls,
+        engine: AsyncEngine,
+        replicas: ReplicaRouter,
+    ) -> AsyncGenerator[AsyncSession, None]:
         logger.debug("SESSION 1: INITIATING")
         async with AsyncSession(engine, expire_on_commit=False, autoflush=False) as session:
+            if replicas.enabled:
+                event.listen(session.sync_session, "after_commit", replicas.on_commit)
             logger.debug("SESSION 2: INITIATED")
             yield session
         logger.debug("SESSION 3: CLOSED")
+
+    @classmethod
+    async def create_replica_sessions(cls, router: ReplicaRouter) -> AsyncGenerator[ReplicaSessions, None]:
+        replicas = ReplicaSessions(router=router)
+        try:
+            yield replicas
+        finally:
+            await replicas.close()
@@ -1,16 +1,24 @@
-from dishka import provide, Provider, Scope, make_async_container
+from dishka import provide, Provider, Scope
 
 from app.services import Services
+from app.core.cache import CacheManager
 from app.repositories import Repositories
 from app.db.resources import DatabaseManager
 
 
 class AppProvider(Provider):
     engine = provide(DatabaseManager.create_sa_engine, scope=Scope.APP)
+    replica_router = provide(DatabaseManager.create_replica_router, scope=Scope.APP)
     session = provide(DatabaseManager.create_session, scope=Scope.REQUEST)
+    replica_sessions = provide(DatabaseManager.create_replica_sessions, scope=Scope.REQUEST)
+    cache = provide(CacheManager.create_cache, scope=Scope.APP)
 
     services = provide(Services, scope=Scope.REQUEST)
     repositories = provide(Repositories, scope=Scope.REQUEST)
 
 
-AppContainer = make_async_container(AppProvider())
+class WorkerProvider(AppProvider):
+    """Taskiq worker, with its own connections budget and no replicas"""
+
+    engine = provide(DatabaseManager.create_worker_sa_engine, scope=Scope.APP)
+    replica_router = provide(DatabaseManager.create_primary_only_router, scope=Scope.APP)
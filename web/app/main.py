@@ -6,13 +6,16 @@ from dishka.integrations.fastapi import setup_dishka
 
 from app.ioc import AppProvider
 from app.utils.fastapi import lifespan
-from app.api import auth, users, posts
+from app.core.queries import QueryStatsMiddleware
+from app.core.metrics import MetricsMiddleware, metrics_endpoint
+from app.utils.responses import FastJSONResponse
+from app.api import auth, users, posts, comments
 
 
 def application_factory() -> FastAPI:
     """"""
 
-    app = FastAPI(lifespan=lifespan)
+    app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
     # In dev purposes
     app.add_middleware(
@@ -23,9 +26,14 @@ def application_factory() -> FastAPI:
         allow_credentials=True,
     )
 
+    app.add_middleware(QueryStatsMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
     app.include_router(auth.router, prefix="/api", tags=["auth"])
     app.include_router(users.router, prefix="/api", tags=["users"])
     app.include_router(posts.router, prefix="/api", tags=["posts"])
+    app.include_router(comments.router, prefix="/api", tags=["comments"])
 
     container = make_async_container(AppProvider())
     setup_dishka(app=app, container=container)
@@ -1,13 +1,16 @@
 from app.db.models import PostsModel
-from app.schemas.posts import PostDTO, UserDTO
+from app.schemas.users import UserPublic
+from app.schemas.posts import PostDTO, PostListDTO
 
 
 class PostMapper:
+    """DTOs are built with `model_construct`, db rows need no validation"""
+
     @staticmethod
     def to_dto(post: PostsModel, is_liked: bool) -> PostDTO:
         """"""
 
-        return PostDTO(
+        return PostDTO.model_construct(
             id=post.id,
             created_at=post.created_at,
             updated_at=post.updated_at,
@@ -17,14 +20,39 @@ class PostMapper:
             is_liked=is_liked,
             user_id=post.user_id,
             likes_count=post.likes_count,
-            author=UserDTO(
+            comments_count=post.comments_count,
+            author=UserPublic.model_construct(
+                id=post.author.id,
+                name=post.author.name,
+                email=post.author.email,
+                created_at=post.author.created_at,
+                updated_at=post.author.updated_at,
+            )
+        )
+
+    @staticmethod
+    def to_list_dto(post: PostsModel, is_liked: bool) -> PostListDTO:
+        """Must not touch `text`, it is not loaded by list queries"""
+
+        return PostListDTO.model_construct(
+            id=post.id,
+            created_at=post.created_at,
+            updated_at=post.updated_at,
+            excerpt=post.excerpt,
+            title=post.title,
+            tags=post.tags,
+            is_liked=is_liked,
+            user_id=post.user_id,
+            likes_count=post.likes_count,
+            comments_count=post.comments_count,
+            rank=post.search_rank,
+            headline=post.search_headline,
+            author=UserPublic.model_construct(
                 id=post.author.id,
                 name=post.author.name,
                 email=post.author.email,
                 created_at=post.author.created_at,
                 updated_at=post.author.updated_at,
-                deleted_at=post.author.deleted_at,
-                hashed_password=post.author.hashed_password,
             )
         )
 
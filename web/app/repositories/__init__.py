@@ -1,12 +1,28 @@
 from app.db.resources import AsyncSession
+from app.db.replicas import ReplicaSessions
 from app.repositories.users import UsersRepository
+from app.repositories.tags import TagsRepository
 from app.repositories.posts import PostsRepository
 from app.repositories.comments import CommentsRepository
 
 
 class Repositories:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, replicas: ReplicaSessions):
         self.session = session
+        self.replicas = replicas
+
+    def read(self, user_id: int | None = None) -> "Repositories":
+        """Repositories for read-only calls, bound to a replica when one is fresh enough
+
+        Falls back to self when replicas are not configured, lag too much
+        or user_id has written recently, so it must not be used for writes.
+        """
+
+        session = self.replicas.get(user_id=user_id)
+        if session is None:
+            return self
+
+        return Repositories(session=session, replicas=self.replicas)
 
     def users(self) -> UsersRepository:
         return UsersRepository(session=self.session)
@@ -16,3 +32,6 @@ class Repositories:
 
     def comments(self) -> CommentsRepository:
         return CommentsRepository(session=self.session)
+
+    def tags(self) -> TagsRepository:
+        return TagsRepository(session=self.session)
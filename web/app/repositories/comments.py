@@ -1,8 +1,14 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import CommentsModel
+from app.db.models import CommentsModel, UsersModel, PostsModel
+from app.repositories.utils import get_all_query
 from app.repositories.generic import SqlAlchemyRepository
-from app.schemas.comments import CommentDTO, CommentUser, CommentPost
+from app.repositories.counting import fetch_page, resolve_fetch_mode, CountStrategy, FetchMode
+from app.schemas.comments import CommentDTO, CommentUser, CommentPost, CommentListItem, CommentAuthor
 
 
 class CommentsRepository:
@@ -15,29 +21,30 @@ class CommentsRepository:
             model=CommentsModel,
         )
 
-    async def __mapper(self, comment: CommentsModel) -> CommentDTO:
+    @staticmethod
+    def __mapper(comment: CommentsModel) -> CommentDTO:
         """"""
 
-        return CommentDTO(
+        return CommentDTO.model_construct(
             id=comment.id,
             created_at=comment.created_at,
             updated_at=comment.updated_at,
             text=comment.text,
             user_id=comment.user_id,
             post_id=comment.post_id,
-            author=CommentUser(
+            author=CommentUser.model_construct(
                 id=comment.author.id,
                 created_at=comment.author.created_at,
                 updated_at=comment.author.updated_at,
                 name=comment.author.name,
                 email=comment.author.email,
             ),
-            post=CommentPost(
+            post=CommentPost.model_construct(
                 id=comment.post.id,
                 user_id=comment.post.user_id,
                 created_at=comment.post.created_at,
                 updated_at=comment.post.updated_at,
-                author=CommentUser(
+                author=CommentUser.model_construct(
                     id=comment.post.author.id,
                     created_at=comment.post.author.created_at,
                     updated_at=comment.post.author.updated_at,
@@ -54,18 +61,77 @@ class CommentsRepository:
         filters: list[dict] | None,
         sorters: list[dict] | None,
         q: str | None = None,
-    ) -> tuple[list[CommentDTO], int]:
+        count_strategy: CountStrategy | None = None,
+        fetch_mode: FetchMode | None = None,
+    ) -> tuple[list[CommentDTO], int, bool]:
         """"""
 
-        comments, count = await self._repository.get_all(
-            q=q,
+        comments, count, count_exact = await self._repository.get_all(
+            q=("text", q) if q is not None else None,
             limit=limit,
             offset=offset,
             filters=filters,
             sorters=sorters,
+            count_strategy=count_strategy,
+            fetch_mode=fetch_mode,
+        )
+
+        return [self.__mapper(comment=comment) for comment in comments], count, count_exact
+
+    async def get_all_for_post(
+        self,
+        post_id: int,
+        limit: int | None,
+        offset: int | None,
+        sorters: list[dict] | None,
+        count_strategy: CountStrategy | None = None,
+        fetch_mode: FetchMode | None = None,
+    ) -> tuple[list[CommentListItem], int, bool]:
+        """Lean listing: comment columns and author name, no joined post"""
+
+        fetch_mode = resolve_fetch_mode(fetch_mode=fetch_mode, count_strategy=count_strategy)
+
+        comments_query, count_query = await get_all_query(
+            model=CommentsModel,
+            query=(
+                sa.select(
+                    CommentsModel.id,
+                    CommentsModel.created_at,
+                    CommentsModel.updated_at,
+                    CommentsModel.text,
+                    CommentsModel.user_id,
+                    UsersModel.name.label("author_name"),
+                )
+                .join(UsersModel, UsersModel.id == CommentsModel.user_id)
+            ),
+            limit=limit,
+            offset=offset,
+            sorters=sorters,
+            filters=[{"field": "post_id", "operation": "eq", "val": post_id}],
+            with_total=fetch_mode == FetchMode.window,
         )
 
-        return [await self.__mapper(comment=comment) for comment in comments], count
+        rows, count, count_exact = await fetch_page(
+            session=self.session,
+            items_query=comments_query,
+            count_query=count_query,
+            count_strategy=count_strategy,
+            fetch_mode=fetch_mode,
+            scalars=False,
+        )
+
+        comments = [
+            CommentListItem.model_construct(
+                id=row.id,
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+                text=row.text,
+                author=CommentAuthor.model_construct(id=row.user_id, name=row.author_name),
+            )
+            for row in rows
+        ]
+
+        return comments, count, count_exact
 
     async def get_by_id(self, _id: int) -> CommentDTO | None:
         """"""
@@ -74,7 +140,30 @@ class CommentsRepository:
         if not comment:
             return None
 
-        return await self.__mapper(comment=comment)
+        return self.__mapper(comment=comment)
+
+    async def get_version(self, _id: int) -> tuple[datetime, ...] | None:
+        """updated_at of comment and of rows embedded in CommentDTO
+
+        Only key columns are read, without loading and mapping the comment.
+        """
+
+        post_author = aliased(UsersModel)
+
+        row = (await self.session.execute(
+            sa.select(
+                CommentsModel.updated_at,
+                UsersModel.updated_at,
+                PostsModel.updated_at,
+                post_author.updated_at,
+            )
+            .join(UsersModel, UsersModel.id == CommentsModel.user_id)
+            .join(PostsModel, PostsModel.id == CommentsModel.post_id)
+            .join(post_author, post_author.id == PostsModel.user_id)
+            .where(CommentsModel.id == _id)
+        )).first()
+
+        return tuple(row) if row else None
 
     async def create(
         self,
@@ -91,10 +180,59 @@ class CommentsRepository:
         )
 
         self.session.add(comment)
+        await self.session.flush()
+
+        await self.session.execute(
+            sa.update(PostsModel)
+            .where(PostsModel.id == post_id)
+            .values(comments_count=PostsModel.comments_count + 1)
+        )
         await self.session.commit()
         await self.session.refresh(comment)
 
-        return await self.__mapper(comment=comment)
+        return self.__mapper(comment=comment)
+
+    async def create_many(
+        self,
+        texts: list[str],
+        user_id: int,
+        post_id: int,
+    ) -> list[CommentDTO]:
+        """Inserts comments with a single INSERT ... RETURNING and one counter update
+
+            :return: created comments in the order of texts
+
+        """
+
+        if not texts:
+            return []
+
+        ids = await self.session.scalars(
+            sa.insert(CommentsModel).returning(CommentsModel.id, sort_by_parameter_order=True),
+            [
+                {
+                    "text": text,
+                    "user_id": user_id,
+                    "post_id": post_id,
+                }
+                for text in texts
+            ],
+        )
+        ids = list(ids)
+
+        await self.session.execute(
+            sa.update(PostsModel)
+            .where(PostsModel.id == post_id)
+            .values(comments_count=PostsModel.comments_count + len(ids))
+        )
+        await self.session.commit()
+
+        comments = await self.session.scalars(
+            sa.select(CommentsModel).where(CommentsModel.id.in_(ids))
+        )
+        comments_by_id = {comment.id: comment for comment in comments}
+
+        return [self.__mapper(comment=comments_by_id[_id]) for _id in ids]
 
     async def update(self, _id: int, values: dict) -> CommentsModel:
         """"""
@@ -102,6 +240,41 @@ class CommentsRepository:
         return await self._repository.update(_id=_id, values=values)
 
     async def delete(self, _id: int):
-        """"""
+        """Deletes comment and decrements posts.comments_count in one transaction
+
+        Comments removed by cascade together with their post need no update.
+        """
+
+        post_id = await self.session.scalar(
+            sa.delete(CommentsModel)
+            .where(CommentsModel.id == _id)
+            .returning(CommentsModel.post_id)
+        )
+
+        if post_id is not None:
+            await self.session.execute(
+                sa.update(PostsModel)
+                .where(PostsModel.id == post_id)
+                .values(comments_count=PostsModel.comments_count - 1)
+            )
+
+        await self.session.commit()
+
+    async def reconcile_comments_count(self) -> int:
+        """Recomputes posts.comments_count where it drifted, returns fixed rows number"""
+
+        actual = (
+            sa.select(sa.func.count(CommentsModel.id))
+            .where(CommentsModel.post_id == PostsModel.id)
+            .scalar_subquery()
+        )
+
+        result = await self.session.execute(
+            sa.update(PostsModel)
+            .where(PostsModel.comments_count != actual)
+            .values(comments_count=actual)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
 
-        return await self._repository.delete(_id=_id)
+        return result.rowcount
@@ -0,0 +1,210 @@
+import json
+import time
+import asyncio
+from enum import Enum
+
+import sqlalchemy as sa
+from sqlalchemy import Select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.expression import Executable, ClauseElement
+
+from app.core.config import settings
+
+COUNT_CACHE_MAX_SIZE = 1024
+TOTAL_COUNT_LABEL = "total_count"
+
+# signature of count query -> (expires_at, count)
+_count_cache: dict[str, tuple[float, int]] = {}
+
+
+class CountStrategy(str, Enum):
+    exact = "exact"
+    cached = "cached"
+    estimated = "estimated"
+
+
+class FetchMode(str, Enum):
+    sequential = "sequential"
+    window = "window"
+    concurrent = "concurrent"
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def compile_explain(element: Explain, compiler, **kwargs) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kwargs)
+
+
+def get_query_signature(query: Select) -> str:
+    """Returns SQL with bound parameters, identical for identical filters"""
+
+    compiled = query.compile(dialect=postgresql.dialect())
+
+    return f"{compiled.string}|{sorted(compiled.params.items())!r}"
+
+
+async def get_exact_count(session: AsyncSession, count_query: Select) -> int:
+    """"""
+
+    return int(await session.scalar(count_query))
+
+
+async def get_cached_count(session: AsyncSession, count_query: Select) -> tuple[int, bool]:
+    """Exact count cached per filter signature for `settings.count_cache_ttl` seconds"""
+
+    now_ = time.monotonic()
+    key = get_query_signature(count_query)
+
+    cached = _count_cache.get(key)
+    if cached is not None and cached[0] > now_:
+        return cached[1], False
+
+    count = await get_exact_count(session=session, count_query=count_query)
+
+    if len(_count_cache) >= COUNT_CACHE_MAX_SIZE:
+        for expired in [k for k, (expires_at, _) in _count_cache.items() if expires_at <= now_]:
+            del _count_cache[expired]
+    if len(_count_cache) >= COUNT_CACHE_MAX_SIZE:
+        del _count_cache[next(iter(_count_cache))]
+
+    _count_cache[key] = (now_ + settings.count_cache_ttl, count)
+
+    return count, True
+
+
+async def get_estimated_count(session: AsyncSession, count_query: Select) -> int | None:
+    """Planner estimate of rows matched by the count query, None if unknown
+
+    Unfiltered counts are read from `pg_class.reltuples`,
+    filtered ones from `EXPLAIN` of the same query.
+    """
+
+    froms = count_query.get_final_froms()
+
+    if count_query.whereclause is None and len(froms) == 1 and isinstance(froms[0], sa.Table):
+        reltuples = await session.scalar(
+            sa.text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+            {"name": froms[0].name},
+        )
+        # -1 for tables that were never vacuumed or analyzed
+        return int(reltuples) if reltuples is not None and reltuples >= 0 else None
+
+    plan = await session.scalar(
+        Explain(count_query.with_only_columns(sa.literal(1)))
+    )
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def get_count(
+    session: AsyncSession,
+    count_query: Select,
+    strategy: CountStrategy | str | None = None,
+) -> tuple[int, bool]:
+    """Returns total count and whether it is exact
+
+        :param session: current session
+        :param count_query: `SELECT count(*)` query built by `get_all_query`
+        :param strategy: one of CountStrategy, `settings.count_strategy` by default
+            exact - always runs the count query
+            cached - reuses exact count of the same filters within TTL
+            estimated - planner estimate when above `settings.count_estimate_threshold`
+
+    """
+
+    strategy = CountStrategy(strategy or settings.count_strategy)
+
+    if strategy == CountStrategy.cached:
+        return await get_cached_count(session=session, count_query=count_query)
+
+    if strategy == CountStrategy.estimated:
+        estimate = await get_estimated_count(session=session, count_query=count_query)
+        if estimate is not None and estimate >= settings.count_estimate_threshold:
+            return estimate, False
+
+    return await get_exact_count(session=session, count_query=count_query), True
+
+
+def resolve_fetch_mode(
+    fetch_mode: FetchMode | str | None = None,
+    count_strategy: CountStrategy | str | None = None,
+    cursor: str | None = None,
+) -> FetchMode:
+    """Returns mode a page should be fetched with, `settings.list_fetch_mode` by default
+
+    Window count is exact and covers rows before the cursor too, so it is used
+    only with exact strategy and offset pagination, otherwise falls back to sequential.
+    """
+
+    fetch_mode = FetchMode(fetch_mode or settings.list_fetch_mode)
+    count_strategy = CountStrategy(count_strategy or settings.count_strategy)
+
+    if fetch_mode == FetchMode.window and (count_strategy != CountStrategy.exact or cursor is not None):
+        return FetchMode.sequential
+
+    return fetch_mode
+
+
+async def get_count_in_new_session(
+    session: AsyncSession,
+    count_query: Select,
+    strategy: CountStrategy | str | None = None,
+) -> tuple[int, bool]:
+    """Runs `get_count` on its own pooled connection, so it can overlap with the items query"""
+
+    async with AsyncSession(session.bind) as count_session:
+        return await get_count(session=count_session, count_query=count_query, strategy=strategy)
+
+
+async def fetch_page(
+    session: AsyncSession,
+    items_query: Select,
+    count_query: Select,
+    count_strategy: CountStrategy | str | None = None,
+    fetch_mode: FetchMode = FetchMode.sequential,
+    scalars: bool = True,
+) -> tuple[list, int, bool]:
+    """Returns page items, total count and whether it is exact
+
+        :param items_query: query built by `get_all_query`, with `with_total`
+            when fetch_mode is window
+        :param count_query: count query built by `get_all_query`
+        :param fetch_mode: one of FetchMode, see `resolve_fetch_mode`
+            sequential - items query, then count query on the same session
+            window - single statement, count is read from `count(*) OVER ()`
+            concurrent - count query runs on a second connection at the same time
+        :param scalars: return first entity of each row instead of rows
+
+    """
+
+    if fetch_mode == FetchMode.window:
+        rows = (await session.execute(items_query)).all()
+        if rows:
+            items = [row[0] for row in rows] if scalars else rows
+            return items, getattr(rows[0], TOTAL_COUNT_LABEL), True
+
+        # offset past the end, nothing to read the window count from
+        return [], await get_exact_count(session=session, count_query=count_query), True
+
+    if fetch_mode == FetchMode.concurrent:
+        result, (count, count_exact) = await asyncio.gather(
+            session.execute(items_query),
+            get_count_in_new_session(session=session, count_query=count_query, strategy=count_strategy),
+        )
+    else:
+        result = await session.execute(items_query)
+        count, count_exact = await get_count(session=session, count_query=count_query, strategy=count_strategy)
+
+    items = result.scalars().all() if scalars else result.all()
+
+    return list(items), count, count_exact
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import Base
 from app.utils.functions import utcnow
 from app.repositories.utils import get_all_query
+from app.repositories.counting import fetch_page, resolve_fetch_mode, CountStrategy, FetchMode
 
 
 class SqlAlchemyRepository[Model: Base]:
@@ -20,10 +21,15 @@ class SqlAlchemyRepository[Model: Base]:
         offset: int | None,
         filters: list[dict] | None,
         sorters: list[dict] | None,
-        q: str | None = None,
-    ) -> tuple[list[Model], int]:
+        q: tuple[str, str] | None = None,
+        cursor: str | None = None,
+        count_strategy: CountStrategy | None = None,
+        fetch_mode: FetchMode | None = None,
+    ) -> tuple[list[Model], int, bool]:
         """"""
 
+        fetch_mode = resolve_fetch_mode(fetch_mode=fetch_mode, count_strategy=count_strategy, cursor=cursor)
+
         items_query, count_query = await get_all_query(
             model=self.model,
             filters=filters,
@@ -31,13 +37,18 @@ class SqlAlchemyRepository[Model: Base]:
             limit=limit,
             offset=offset,
             text_search=q,
+            cursor=cursor,
             query=select(self.model),
+            with_total=fetch_mode == FetchMode.window,
         )
 
-        items = await self.session.scalars(items_query)
-        count = await self.session.scalar(count_query)
-
-        return list(items), count
+        return await fetch_page(
+            session=self.session,
+            items_query=items_query,
+            count_query=count_query,
+            count_strategy=count_strategy,
+            fetch_mode=fetch_mode,
+        )
 
     async def get_by_id(self, _id: int) -> Model | None:
         """"""
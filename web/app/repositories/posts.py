@@ -1,9 +1,18 @@
+from collections import Counter
+
 import sqlalchemy as sa
+from sqlalchemy.orm import with_expression, defer
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import PostsModel, LikesModel
+from app.db.models import PostsModel, LikesModel, TagsModel, SEARCH_CONFIG
+from app.utils.functions import utcnow, make_excerpt
+from app.repositories.tags import TagsRepository
 from app.repositories.utils import get_all_query
 from app.repositories.generic import SqlAlchemyRepository
+from app.repositories.counting import fetch_page, resolve_fetch_mode, CountStrategy, FetchMode
+
+HEADLINE_OPTIONS = "MaxFragments=2, MaxWords=30, MinWords=10, StartSel=<b>, StopSel=</b>"
 
 
 class PostsRepository:
@@ -15,6 +24,7 @@ class PostsRepository:
             session=session,
             model=PostsModel,
         )
+        self._tags = TagsRepository(session=session)
 
     async def get_all(
         self,
@@ -24,40 +34,102 @@ class PostsRepository:
         sorters: list[dict] | None,
         q: str | None = None,
         tags: list[str] | None = None,
-    ) -> tuple[list[PostsModel], int]:
-        """"""
+        cursor: str | None = None,
+        count_strategy: CountStrategy | None = None,
+        highlight: bool = False,
+        user_id: int | None = None,
+        fetch_mode: FetchMode | None = None,
+    ) -> tuple[list[PostsModel], int, bool]:
+        """Returns page of posts and total count
+
+            :param user_id: fill `is_liked` for this user in the same query
+            :param q: full-text query over title and text in websearch syntax,
+                results are ordered by relevance and carry `search_rank`
+            :param highlight: fill `search_headline` with matched fragments of text
+
+        """
+
+        # full text is loaded only by get_by_id, lists use excerpt
+        query = sa.select(PostsModel).options(defer(PostsModel.text, raiseload=True))
+        clauses = []
+
+        if user_id is not None:
+            query = query.options(self._with_is_liked(user_id=user_id))
+
+        if q is not None:
+            if cursor is not None:
+                raise ValueError("Cursor pagination is not supported for search")
+
+            ts_query = sa.func.websearch_to_tsquery(SEARCH_CONFIG, q)
+            rank = sa.func.ts_rank(PostsModel.search_vector, ts_query)
+
+            query = (
+                query
+                .options(with_expression(PostsModel.search_rank, rank))
+                .order_by(rank.desc())
+            )
+            if highlight:
+                query = query.options(
+                    with_expression(
+                        PostsModel.search_headline,
+                        sa.func.ts_headline(SEARCH_CONFIG, PostsModel.text, ts_query, HEADLINE_OPTIONS),
+                    )
+                )
+
+            clauses.append(PostsModel.search_vector.bool_op("@@")(ts_query))
+
+        if tags is not None:
+            clauses.append(PostsModel.tags.bool_op("&&")(tags))
+
+        fetch_mode = resolve_fetch_mode(fetch_mode=fetch_mode, count_strategy=count_strategy, cursor=cursor)
 
         posts_query, count_query = await get_all_query(
             model=PostsModel,
-            query=sa.select(PostsModel),
+            query=query,
             limit=limit,
             offset=offset,
             filters=filters,
             sorters=sorters,
-            text_search=("title", q) if q is not None else None,
+            cursor=cursor,
+            with_total=fetch_mode == FetchMode.window,
         )
 
-        if tags is not None:
-            posts_query = posts_query.where(
-                PostsModel.tags.bool_op("&&")(tags)
-            )
-            count_query = count_query.where(
-                PostsModel.tags.bool_op("&&")(tags)
-            )
+        if clauses:
+            posts_query = posts_query.where(*clauses)
+            count_query = count_query.where(*clauses)
 
-        posts = await self.session.scalars(posts_query)
-        count = await self.session.scalar(count_query)
+        return await fetch_page(
+            session=self.session,
+            items_query=posts_query,
+            count_query=count_query,
+            count_strategy=count_strategy,
+            fetch_mode=fetch_mode,
+        )
 
-        return list(posts), int(count)
+    async def get_by_id(self, _id: int, user_id: int | None = None) -> PostsModel | None:
+        """Returns post, with `is_liked` filled for user_id if given"""
 
-    async def get_by_id(self, _id: int) -> PostsModel | None:
-        """"""
+        if user_id is None:
+            return await self._repository.get_by_id(_id=_id)
 
-        post = await self._repository.get_by_id(_id=_id)
-        if not post:
-            return None
+        return await self.session.scalar(
+            sa.select(PostsModel)
+            .where(PostsModel.id == _id)
+            .options(self._with_is_liked(user_id=user_id))
+            .execution_options(populate_existing=True)
+        )
 
-        return post
+    @staticmethod
+    def _with_is_liked(user_id: int):
+        return with_expression(
+            PostsModel.is_liked,
+            sa.exists().where(
+                sa.and_(
+                    LikesModel.user_id == user_id,
+                    LikesModel.post_id == PostsModel.id,
+                )
+            ),
+        )
 
     async def create(
             self,
@@ -71,63 +143,251 @@ class PostsRepository:
         post = PostsModel(
             tags=tags,
             text=text,
+            excerpt=make_excerpt(text),
             title=title,
             user_id=user_id,
         )
         self.session.add(post)
+        await self._tags.add_posts(names=set(tags))
         await self.session.commit()
         await self.session.refresh(post)
 
         return post
 
+    async def create_many(self, user_id: int, items: list[dict]) -> list[PostsModel]:
+        """Inserts posts of one author with a single INSERT ... RETURNING
+
+            :param items: dicts with text, title and tags
+            :return: created posts in the order of items
+
+        """
+
+        if not items:
+            return []
+
+        ids = await self.session.scalars(
+            insert(PostsModel).returning(PostsModel.id, sort_by_parameter_order=True),
+            [
+                {
+                    "tags": item["tags"],
+                    "text": item["text"],
+                    "excerpt": make_excerpt(item["text"]),
+                    "title": item["title"],
+                    "user_id": user_id,
+                }
+                for item in items
+            ],
+        )
+        ids = list(ids)
+
+        await self._tags.add_posts_counts(
+            counts=Counter(name for item in items for name in set(item["tags"])),
+        )
+        await self.session.commit()
+
+        posts = await self.session.scalars(
+            sa.select(PostsModel).where(PostsModel.id.in_(ids))
+        )
+        posts_by_id = {post.id: post for post in posts}
+
+        return [posts_by_id[_id] for _id in ids]
+
     async def update(self, _id: int, values: dict):
-        """"""
+        """Updates post, keeping tags catalog and excerpt in sync"""
+
+        if values.get("text") is not None:
+            values = {**values, "excerpt": make_excerpt(values["text"])}
+
+        if values.get("tags") is not None:
+            old_tags = await self.session.scalar(
+                sa.select(PostsModel.tags)
+                .where(PostsModel.id == _id)
+                .with_for_update()
+            )
+            old_tags, new_tags = set(old_tags or []), set(values["tags"])
+
+            await self._tags.remove_posts(names=old_tags - new_tags)
+            await self._tags.add_posts(names=new_tags - old_tags)
 
         return await self._repository.update(_id=_id, values=values)
 
     async def delete(self, _id: int):
         """"""
 
-        return await self._repository.delete(_id=_id)
+        tags = await self.session.scalar(
+            sa.delete(PostsModel)
+            .where(PostsModel.id == _id)
+            .returning(PostsModel.tags)
+        )
+        await self._tags.remove_posts(names=set(tags or []))
+        await self.session.commit()
 
-    async def get_all_tags(self) -> set[str]:
+    async def get_all_tags(
+        self,
+        limit: int | None,
+        offset: int | None,
+    ) -> tuple[list[TagsModel], int, bool]:
         """"""
 
-        query = sa.select(PostsModel.tags)
-        all_tags = await self.session.scalars(query)
+        return await self._tags.get_all(limit=limit, offset=offset)
 
-        unique_tags = set()
-        for tag in all_tags:
-            unique_tags.update(tag)
+    async def like(self, post_id: int, user_id: int) -> tuple[int | None, bool]:
+        """Idempotent like in a single statement
 
-        return unique_tags
-
-    async def like(self, post_id: int, user_id: int):
-        """"""
+        Inserts like, increments posts.likes_count if the like is new and
+        reads resulting count. Returns likes count (None if post does not
+        exist) and whether anything changed.
+        """
 
-        like = LikesModel(
-            user_id=user_id,
-            post_id=post_id
+        inserted = (
+            insert(LikesModel)
+            .from_select(
+                ["user_id", "post_id", "created_at"],
+                sa.select(sa.literal(user_id), PostsModel.id, sa.literal(utcnow()))
+                .where(PostsModel.id == post_id)
+            )
+            .on_conflict_do_nothing(index_elements=["user_id", "post_id"])
+            .returning(LikesModel.post_id)
+            .cte("inserted")
+        )
+        updated = (
+            sa.update(PostsModel)
+            .where(PostsModel.id == inserted.c.post_id)
+            .values(likes_count=PostsModel.likes_count + 1)
+            .returning(PostsModel.likes_count)
+            .cte("updated")
         )
-        self.session.add(like)
-        await self.session.commit()
 
-    async def dislike(self, post_id: int, user_id: int):
-        """"""
+        return await self._apply_like_change(post_id=post_id, updated=updated)
 
-        like = await self.session.scalar(
-            sa.select(LikesModel)
+    async def dislike(self, post_id: int, user_id: int) -> tuple[int | None, bool]:
+        """Idempotent removal of like in a single statement, see `like`"""
+
+        deleted = (
+            sa.delete(LikesModel)
             .where(
                 sa.and_(
                     LikesModel.post_id == post_id,
                     LikesModel.user_id == user_id,
                 )
             )
+            .returning(LikesModel.post_id)
+            .cte("deleted")
+        )
+        updated = (
+            sa.update(PostsModel)
+            .where(PostsModel.id == deleted.c.post_id)
+            .values(likes_count=PostsModel.likes_count - 1)
+            .returning(PostsModel.likes_count)
+            .cte("updated")
+        )
+
+        return await self._apply_like_change(post_id=post_id, updated=updated)
+
+    async def _apply_like_change(self, post_id: int, updated) -> tuple[int | None, bool]:
+        # snapshot of posts inside the statement does not see the update,
+        # so the new count is taken from the update itself when it happened
+        query = sa.select(
+            sa.func.coalesce(
+                sa.select(updated.c.likes_count).scalar_subquery(),
+                sa.select(PostsModel.likes_count)
+                .where(PostsModel.id == post_id)
+                .scalar_subquery(),
+            ),
+            sa.exists(sa.select(updated.c.likes_count)),
+        )
+
+        likes_count, changed = (await self.session.execute(query)).one()
+        await self.session.commit()
+
+        return likes_count, changed
+
+    async def apply_likes(
+        self,
+        liked: list[tuple[int, int]],
+        disliked: list[tuple[int, int]],
+    ) -> set[int]:
+        """Writes batch of (user_id, post_id) likes and dislikes in one transaction
+
+        Already existing likes, missing likes and deleted posts are skipped,
+        likes_count is changed by the number of actually changed rows.
+        Returns ids of changed posts.
+        """
+
+        deltas: dict[int, int] = {}
+
+        if liked:
+            rows = (
+                sa.values(
+                    sa.column("user_id", sa.Integer),
+                    sa.column("post_id", sa.Integer),
+                    name="intents",
+                )
+                .data(sorted(liked))
+            )
+            inserted = await self.session.scalars(
+                insert(LikesModel)
+                .from_select(
+                    ["user_id", "post_id", "created_at"],
+                    sa.select(rows.c.user_id, rows.c.post_id, sa.literal(utcnow()))
+                    .join(PostsModel, PostsModel.id == rows.c.post_id)
+                )
+                .on_conflict_do_nothing(index_elements=["user_id", "post_id"])
+                .returning(LikesModel.post_id)
+            )
+            for post_id in inserted:
+                deltas[post_id] = deltas.get(post_id, 0) + 1
+
+        if disliked:
+            deleted = await self.session.scalars(
+                sa.delete(LikesModel)
+                .where(sa.tuple_(LikesModel.user_id, LikesModel.post_id).in_(sorted(disliked)))
+                .returning(LikesModel.post_id)
+                .execution_options(synchronize_session=False)
+            )
+            for post_id in deleted:
+                deltas[post_id] = deltas.get(post_id, 0) - 1
+
+        changes = sorted((post_id, delta) for post_id, delta in deltas.items() if delta)
+        if changes:
+            changes_values = (
+                sa.values(
+                    sa.column("post_id", sa.Integer),
+                    sa.column("delta", sa.Integer),
+                    name="changes",
+                )
+                .data(changes)
+            )
+            await self.session.execute(
+                sa.update(PostsModel)
+                .where(PostsModel.id == changes_values.c.post_id)
+                .values(likes_count=PostsModel.likes_count + changes_values.c.delta)
+                .execution_options(synchronize_session=False)
+            )
+
+        await self.session.commit()
+
+        return set(deltas)
+
+    async def reconcile_likes_count(self) -> int:
+        """Recomputes posts.likes_count where it drifted, returns fixed rows number"""
+
+        actual = (
+            sa.select(sa.func.count(LikesModel.post_id))
+            .where(LikesModel.post_id == PostsModel.id)
+            .scalar_subquery()
         )
 
-        await self.session.delete(like)
+        result = await self.session.execute(
+            sa.update(PostsModel)
+            .where(PostsModel.likes_count != actual)
+            .values(likes_count=actual)
+            .execution_options(synchronize_session=False)
+        )
         await self.session.commit()
 
+        return result.rowcount
+
     async def get_like(self, post_id: int, user_id: int) -> LikesModel | None:
         """"""
 
@@ -0,0 +1,107 @@
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import TagsModel
+from app.repositories.utils import get_all_query
+from app.repositories.counting import fetch_page, resolve_fetch_mode, CountStrategy, FetchMode
+
+
+class TagsRepository:
+    """Tags catalog, changes are flushed within the caller's transaction"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_all(
+        self,
+        limit: int | None,
+        offset: int | None,
+        count_strategy: CountStrategy | None = None,
+        fetch_mode: FetchMode | None = None,
+    ) -> tuple[list[TagsModel], int, bool]:
+        """Returns tags used by at least one post, most popular first"""
+
+        fetch_mode = resolve_fetch_mode(fetch_mode=fetch_mode, count_strategy=count_strategy)
+
+        tags_query, count_query = await get_all_query(
+            model=TagsModel,
+            query=sa.select(TagsModel),
+            limit=limit,
+            offset=offset,
+            filters=[{"field": "posts_count", "operation": "gt", "val": 0}],
+            sorters=[
+                {"field": "posts_count", "order": "desc"},
+                {"field": "name", "order": "asc"},
+            ],
+            with_total=fetch_mode == FetchMode.window,
+        )
+
+        return await fetch_page(
+            session=self.session,
+            items_query=tags_query,
+            count_query=count_query,
+            count_strategy=count_strategy,
+            fetch_mode=fetch_mode,
+        )
+
+    async def add_posts(self, names: set[str]):
+        """Increments posts_count of given tags, creating missing ones"""
+
+        await self.add_posts_counts(counts={name: 1 for name in names})
+
+    async def add_posts_counts(self, counts: dict[str, int]):
+        """Increments posts_count of tags by number of new posts using them"""
+
+        if not counts:
+            return
+
+        # stable order prevents deadlocks between concurrent upserts
+        query = insert(TagsModel).values([
+            {"name": name, "posts_count": counts[name]} for name in sorted(counts)
+        ])
+        query = query.on_conflict_do_update(
+            index_elements=[TagsModel.name],
+            set_={"posts_count": TagsModel.posts_count + query.excluded.posts_count},
+        )
+
+        await self.session.execute(query)
+
+    async def remove_posts(self, names: set[str]):
+        """Decrements posts_count of given tags"""
+
+        if not names:
+            return
+
+        await self.session.execute(
+            sa.update(TagsModel)
+            .where(TagsModel.name.in_(sorted(names)))
+            .values(posts_count=TagsModel.posts_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def reconcile(self) -> int:
+        """Recomputes catalog from posts.tags, returns fixed rows number"""
+
+        upserted = await self.session.execute(sa.text(
+            """
+            INSERT INTO tags (name, posts_count)
+            SELECT tag, count(DISTINCT posts.id)
+            FROM posts, unnest(posts.tags) AS tag
+            GROUP BY tag
+            ON CONFLICT (name) DO UPDATE
+            SET posts_count = excluded.posts_count
+            WHERE tags.posts_count <> excluded.posts_count
+            """
+        ))
+        zeroed = await self.session.execute(sa.text(
+            """
+            UPDATE tags
+            SET posts_count = 0
+            WHERE posts_count <> 0
+              AND NOT EXISTS (SELECT 1 FROM posts WHERE tags.name = ANY(posts.tags))
+            """
+        ))
+        await self.session.commit()
+
+        return upserted.rowcount + zeroed.rowcount
@@ -16,10 +16,11 @@ class UsersRepository:
             model=UsersModel,
         )
 
-    async def __mapper(self, user: UsersModel) -> UserDTO:
+    @staticmethod
+    def __mapper(user: UsersModel) -> UserDTO:
         """"""
 
-        return UserDTO(
+        return UserDTO.model_construct(
             id=user.id,
             name=user.name,
             email=user.email,
@@ -36,7 +37,7 @@ class UsersRepository:
         if not user:
             return None
 
-        return await self.__mapper(user=user)
+        return self.__mapper(user=user)
 
     async def get_by_email(self, email: str) -> UserDTO | None:
         """"""
@@ -47,7 +48,7 @@ class UsersRepository:
         if not user:
             return None
 
-        return await self.__mapper(user=user)
+        return self.__mapper(user=user)
 
     async def create(self, email: str, name: str, hashed_password: str) -> UserDTO:
         """"""
@@ -61,7 +62,7 @@ class UsersRepository:
         await self.session.commit()
         await self.session.refresh(user)
 
-        return await self.__mapper(user=user)
+        return self.__mapper(user=user)
 
     async def update(self, _id: int, values: dict):
         """"""
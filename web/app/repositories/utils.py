@@ -1,10 +1,16 @@
+import json
+import base64
+import binascii
 from typing import Type
+from datetime import datetime
 from operator import eq, ne, ge, gt, le, lt
 
 import sqlalchemy as sa
 from sqlalchemy import Select
 
 from app.db.models import Base
+from app.core.config import settings
+from app.repositories.counting import TOTAL_COUNT_LABEL
 
 
 operators_map = {
@@ -56,6 +62,95 @@ async def apply_sorters(query, model: Type[Base], sorters: list[dict]):
     return query
 
 
+def get_page_size(limit: int | None) -> int:
+    """Applies default and server-side maximum to the requested page size"""
+
+    if not limit or limit < 1:
+        return settings.default_page_size
+
+    return min(limit, settings.max_page_size)
+
+
+def encode_cursor(values: dict) -> str:
+    """Packs sort key values of the last returned row into an opaque cursor"""
+
+    raw = json.dumps(
+        values,
+        separators=(",", ":"),
+        default=lambda val: val.isoformat() if isinstance(val, datetime) else str(val),
+    )
+
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("utf-8").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """"""
+
+    padding = "=" * (-len(cursor) % 4)
+
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, binascii.Error):
+        raise ValueError("Invalid pagination cursor")
+
+    if not isinstance(values, dict):
+        raise ValueError("Invalid pagination cursor")
+
+    return values
+
+
+def get_keyset_sorters(sorters: list[dict] | None) -> list[dict]:
+    """Returns sorters with `id` appended as a unique tiebreaker"""
+
+    sorters = list(sorters or [{"field": "id", "order": "desc"}])
+
+    if all(sorter["field"] != "id" for sorter in sorters):
+        sorters.append({"field": "id", "order": sorters[-1]["order"]})
+
+    return sorters
+
+
+def get_next_cursor(items: list, sorters: list[dict] | None, limit: int | None) -> str | None:
+    """Builds cursor for the page following `items`, None for the last page"""
+
+    if not items or len(items) < get_page_size(limit):
+        return None
+
+    last = items[-1]
+
+    return encode_cursor({
+        sorter["field"]: getattr(last, sorter["field"])
+        for sorter in get_keyset_sorters(sorters)
+    })
+
+
+async def apply_cursor(query, model: Type[Base], sorters: list[dict], cursor: str):
+    """Applies `WHERE (sort keys) < (cursor values)` instead of OFFSET"""
+
+    if len({sorter["order"] for sorter in sorters}) != 1:
+        raise ValueError("Cursor pagination requires the same order for all sorters")
+
+    values = decode_cursor(cursor)
+
+    columns, bounds = [], []
+    for sorter in sorters:
+        field = getattr(model, sorter["field"])
+
+        if sorter["field"] not in values:
+            raise ValueError("Invalid pagination cursor")
+
+        val = values[sorter["field"]]
+        if isinstance(field.type, sa.DateTime) and isinstance(val, str):
+            val = datetime.fromisoformat(val)
+
+        columns.append(field)
+        bounds.append(val)
+
+    operation = lt if sorters[0]["order"] == "desc" else gt
+
+    return query.where(operation(sa.tuple_(*columns), sa.tuple_(*bounds)))
+
+
 async def get_all_query(
     model,
     query: Select,
@@ -64,19 +159,26 @@ async def get_all_query(
     sorters: list[dict] | None,
     filters: list[dict] | None,
     text_search: tuple[str, str] | None = None,
+    cursor: str | None = None,
+    with_total: bool = False,
 ) -> tuple[Select, Select]:
     """Returns query for getting object and count query
 
         :param model: any sqlalchemy model
         :param query: any Select query
-        :param limit: number of objects to be returned
-        :param offset: offset characteristics for the query
+        :param limit: number of objects to be returned,
+            capped by `settings.max_page_size`
+        :param offset: offset characteristics for the query,
+            ignored when `cursor` is given
         :param sorters: sorting rules for current query
             example: {"created_at": "desc", "price": "asc"}
         :param filters: all filtering values which will apply AND logic
             example: {"price": 24.3}
         :param text_search: field and value for text search
             example: ("name", "ang")
+        :param cursor: opaque keyset cursor returned with the previous page
+        :param with_total: add `count(*) OVER ()` as `total_count` column,
+            so the page and its total come from one statement
 
     """
 
@@ -96,12 +198,19 @@ async def get_all_query(
 
     if text_search:
         field, value = text_search
-        query = query.where(
-            sa.text(f"{model.__tablename__}.{getattr(model, field).name} ILIKE '%{value}%'")
-        )
-        count_query = count_query.where(
-            sa.text(f"{model.__tablename__}.{getattr(model, field).name} ILIKE '%{value}%'")
+        clause = getattr(model, field).icontains(value, autoescape=True)
+        query = query.where(clause)
+        count_query = count_query.where(clause)
+
+    if cursor is not None:
+        sorters = get_keyset_sorters(sorters)
+        query = await apply_cursor(
+            model=model,
+            query=query,
+            cursor=cursor,
+            sorters=sorters,
         )
+        offset = None
 
     if sorters:
         query = await apply_sorters(
@@ -114,6 +223,9 @@ async def get_all_query(
         query = query.where(model.deleted_at.is_(None))
         count_query = count_query.where(model.deleted_at.is_(None))
 
-    query = query.limit(limit).offset(offset)
+    if with_total:
+        query = query.add_columns(sa.func.count().over().label(TOTAL_COUNT_LABEL))
+
+    query = query.limit(get_page_size(limit)).offset(offset)
 
     return query, count_query
@@ -2,6 +2,8 @@ from datetime import datetime
 
 from pydantic import BaseModel
 
+from app.schemas.mixins import ResponseItems
+
 
 class CommentUser(BaseModel):
     id: int
@@ -34,6 +36,24 @@ class CommentPublic(CommentDTO):
     pass
 
 
+# Post comments listing, post context is sent once per page
+class CommentAuthor(BaseModel):
+    id: int
+    name: str
+
+
+class CommentListItem(BaseModel):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+    text: str
+    author: CommentAuthor
+
+
+class PostCommentsPage(ResponseItems[CommentListItem]):
+    post: CommentPost
+
+
 # Requests
 class CommentCreateRequest(BaseModel):
     text: str
@@ -1,14 +1,33 @@
 from enum import Enum
-from typing import TypeVar, List, Generic
+from typing import TypeVar, List, Generic, Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 T = TypeVar("T")
 
 
 class ResponseItems(BaseModel, Generic[T]):
     count: int
+    count_exact: bool = True
     items: List[T]
+    next_cursor: str | None = None
+
+
+# Batch writes, items are validated one by one so one bad item does not fail the rest
+class BatchRequest(BaseModel):
+    items: List[dict[str, Any]] = Field(min_length=1)
+
+
+class BatchItemResult(BaseModel, Generic[T]):
+    index: int
+    ok: bool
+    item: T | None = None
+    errors: List[dict] | None = None
+
+
+class BatchResponse(BaseModel, Generic[T]):
+    created: int
+    items: List[BatchItemResult[T]]
 
 
 # Filters, Sorters
@@ -1,7 +1,7 @@
 from datetime import datetime
 
 from pydantic import BaseModel
-from app.schemas.users import UserDTO, UserPublic
+from app.schemas.users import UserPublic
 
 
 class PostDTO(BaseModel):
@@ -14,8 +14,9 @@ class PostDTO(BaseModel):
     user_id: int
     is_liked: bool
     tags: list[str]
-    author: UserDTO
+    author: UserPublic
     likes_count: int
+    comments_count: int
 
 
 class PostPublic(BaseModel):
@@ -28,7 +29,43 @@ class PostPublic(BaseModel):
     is_liked: bool
     tags: list[str]
     likes_count: int
+    comments_count: int
+    author: UserPublic
+
+
+# Lists carry excerpt instead of the full text
+class PostListDTO(BaseModel):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    excerpt: str
+    title: str
+    user_id: int
+    is_liked: bool
+    tags: list[str]
+    author: UserPublic
+    likes_count: int
+    comments_count: int
+    # only for search results
+    rank: float | None = None
+    headline: str | None = None
+
+
+class PostListPublic(BaseModel):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    excerpt: str
+    title: str
+    is_liked: bool
+    tags: list[str]
+    likes_count: int
+    comments_count: int
     author: UserPublic
+    rank: float | None = None
+    headline: str | None = None
 
 
 # Requests
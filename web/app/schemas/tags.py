@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+
+
+class TagPublic(BaseModel):
+    name: str
+    posts_count: int
@@ -1,10 +1,20 @@
+from app.core.cache import Cache
 from app.repositories import Repositories
 from app.services.posts import PostsService
+from app.services.users import UsersService
+from app.services.comments import CommentsService
 
 
 class Services:
-    def __init__(self, repositories: Repositories):
+    def __init__(self, repositories: Repositories, cache: Cache):
         self.repositories = repositories
+        self.cache = cache
 
     def posts(self) -> PostsService:
-        return PostsService(repositories=self.repositories)
+        return PostsService(repositories=self.repositories, cache=self.cache)
+
+    def users(self) -> UsersService:
+        return UsersService(repositories=self.repositories, cache=self.cache)
+
+    def comments(self) -> CommentsService:
+        return CommentsService(repositories=self.repositories, cache=self.cache)
@@ -0,0 +1,42 @@
+from app.core.cache import Cache
+from app.schemas.comments import CommentDTO
+from app.repositories import Repositories
+from app.services.posts import PostsService
+
+
+class CommentsService:
+    """Comment writes, which also change cached posts.comments_count"""
+
+    def __init__(self, repositories: Repositories, cache: Cache):
+        self.repositories = repositories
+        self.cache = cache
+
+    async def create(self, text: str, user_id: int, post_id: int) -> CommentDTO:
+        """"""
+
+        comment = await self.repositories.comments().create(
+            text=text,
+            user_id=user_id,
+            post_id=post_id,
+        )
+        await self.cache.invalidate(PostsService.cache_key(post_id))
+
+        return comment
+
+    async def create_many(self, texts: list[str], user_id: int, post_id: int) -> list[CommentDTO]:
+        """"""
+
+        comments = await self.repositories.comments().create_many(
+            texts=texts,
+            user_id=user_id,
+            post_id=post_id,
+        )
+        await self.cache.invalidate(PostsService.cache_key(post_id))
+
+        return comments
+
+    async def delete(self, comment: CommentDTO):
+        """"""
+
+        await self.repositories.comments().delete(_id=comment.id)
+        await self.cache.invalidate(PostsService.cache_key(comment.post_id))
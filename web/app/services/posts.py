@@ -1,11 +1,19 @@
-from app.schemas.posts import PostDTO
+from app.core.cache import Cache
+from app.schemas.posts import PostDTO, PostListDTO
 from app.mappers.posts import PostMapper
 from app.repositories import Repositories
+from app.repositories.counting import CountStrategy
+from app.services.users import UsersService
 
 
 class PostsService:
-    def __init__(self, repositories: Repositories):
+    def __init__(self, repositories: Repositories, cache: Cache):
         self.repositories = repositories
+        self.cache = cache
+
+    @staticmethod
+    def cache_key(_id: int) -> str:
+        return f"posts:{_id}"
 
     async def create(self, tags: list[str], text: str, title: str, user_id: int):
         """"""
@@ -19,6 +27,13 @@ class PostsService:
 
         return PostMapper.to_dto(post, is_liked=False)
 
+    async def create_many(self, user_id: int, items: list[dict]) -> list[PostDTO]:
+        """"""
+
+        posts = await self.repositories.posts().create_many(user_id=user_id, items=items)
+
+        return [PostMapper.to_dto(post, is_liked=False) for post in posts]
+
     async def get_all(
         self,
         user_id: int | None,
@@ -28,51 +43,112 @@ class PostsService:
         sorters: list[dict] | None,
         q: str | None = None,
         tags: list[str] | None = None,
-    ) -> tuple[list[PostDTO], int]:
+        cursor: str | None = None,
+        count_strategy: CountStrategy | None = None,
+        highlight: bool = False,
+    ) -> tuple[list[PostListDTO], int, bool]:
         """"""
 
-        posts, count = await self.repositories.posts().get_all(
+        posts, count, count_exact = await self.repositories.read(user_id=user_id).posts().get_all(
             q=q,
             tags=tags,
+            cursor=cursor,
             limit=limit,
             offset=offset,
             filters=filters,
             sorters=sorters,
+            highlight=highlight,
+            count_strategy=count_strategy,
+            user_id=user_id,
         )
 
-        if user_id is None:
-            liked = {post.id: False for post in posts}
-        else:
-            liked = await self.repositories.posts().posts_liked(
-                user_id=user_id,
-                posts_ids=[post.id for post in posts]
-            )
-
-        return [PostMapper.to_dto(post, liked[post.id]) for post in posts], count
+        return [PostMapper.to_list_dto(post, bool(post.is_liked)) for post in posts], count, count_exact
 
     async def get_by_id(self, _id: int, user_id: int | None) -> PostDTO | None:
-        """"""
+        """Post is read through cache without is_liked, which is per user
+
+        On a miss is_liked comes with the same query, on a hit it is
+        looked up separately. The author is taken from the users cache,
+        which profile updates invalidate, the cached copy would stay
+        stale until TTL after a rename.
+        """
+
+        loaded_is_liked = None
+
+        async def load() -> PostDTO | None:
+            nonlocal loaded_is_liked
+
+            # from the primary, a lagging replica would refill the shared cache with stale rows
+            post = await self.repositories.posts().get_by_id(_id=_id, user_id=user_id)
+            if post is None:
+                return None
+
+            loaded_is_liked = bool(post.is_liked)
 
-        post = await self.repositories.posts().get_by_id(_id=_id)
+            return PostMapper.to_dto(post, is_liked=False)
+
+        post = await self.cache.get_or_load(
+            key=self.cache_key(_id),
+            schema=PostDTO,
+            loader=load,
+        )
         if post is None:
             return None
 
+        author = await UsersService(repositories=self.repositories, cache=self.cache).get_by_id(_id=post.user_id)
+        if author is not None:
+            post = post.model_copy(update={"author": author})
+
         if user_id is None:
-            liked = {post.id: False}
-        else:
+            return post
+
+        # another request could have loaded it for a different user
+        if loaded_is_liked is None:
             liked = await self.repositories.posts().posts_liked(
                 user_id=user_id,
                 posts_ids=[post.id]
             )
+            loaded_is_liked = liked[post.id]
 
-        return PostMapper.to_dto(post, liked[post.id])
+        return post.model_copy(update={"is_liked": loaded_is_liked})
 
     async def update(self, _id: int, values: dict):
         """"""
 
-        return await self.repositories.posts().update(_id=_id, values=values)
+        await self.repositories.posts().update(_id=_id, values=values)
+        await self.cache.invalidate(self.cache_key(_id))
 
     async def delete(self, _id: int):
         """"""
 
-        return await self.repositories.posts().delete(_id=_id)
+        await self.repositories.posts().delete(_id=_id)
+        await self.cache.invalidate(self.cache_key(_id))
+
+    async def like(self, _id: int, user_id: int) -> PostDTO | None:
+        """Idempotent like, returns post as seen by the user afterwards"""
+
+        return await self._change_like(_id=_id, user_id=user_id, liked=True)
+
+    async def dislike(self, _id: int, user_id: int) -> PostDTO | None:
+        """Idempotent removal of like, see `like`"""
+
+        return await self._change_like(_id=_id, user_id=user_id, liked=False)
+
+    async def _change_like(self, _id: int, user_id: int, liked: bool) -> PostDTO | None:
+        # read before the write, so the cached post is reused instead of reloaded
+        post = await self.get_by_id(_id=_id, user_id=None)
+        if post is None:
+            return None
+
+        if liked:
+            likes_count, changed = await self.repositories.posts().like(post_id=_id, user_id=user_id)
+        else:
+            likes_count, changed = await self.repositories.posts().dislike(post_id=_id, user_id=user_id)
+
+        if likes_count is None:
+            return None
+
+        if changed:
+            await self.cache.invalidate(self.cache_key(_id))
+
+        return post.model_copy(update={"is_liked": liked, "likes_count": likes_count})
@@ -0,0 +1,36 @@
+from app.core.cache import Cache
+from app.schemas.users import UserPublic
+from app.repositories import Repositories
+
+
+class UsersService:
+    def __init__(self, repositories: Repositories, cache: Cache):
+        self.repositories = repositories
+        self.cache = cache
+
+    @staticmethod
+    def cache_key(_id: int) -> str:
+        return f"users:{_id}"
+
+    async def get_by_id(self, _id: int) -> UserPublic | None:
+        """Public profile, read through cache"""
+
+        async def load() -> UserPublic | None:
+            # from the primary, a lagging replica would refill the shared cache with stale rows
+            user = await self.repositories.users().get_by_id(_id=_id)
+            if user is None:
+                return None
+
+            return UserPublic.model_validate(user.model_dump())
+
+        return await self.cache.get_or_load(
+            key=self.cache_key(_id),
+            schema=UserPublic,
+            loader=load,
+        )
+
+    async def update(self, _id: int, values: dict):
+        """"""
+
+        await self.repositories.users().update(_id=_id, values=values)
+        await self.cache.invalidate(self.cache_key(_id))
@@ -0,0 +1,16 @@
+from taskiq import AsyncBroker, InMemoryBroker
+from taskiq_redis import ListQueueBroker
+
+from app.core.config import settings
+
+
+def create_broker() -> AsyncBroker:
+    """Redis broker, or in-process one when BROKER_URL is not set (dev, tests)"""
+
+    if not settings.broker_url:
+        return InMemoryBroker()
+
+    return ListQueueBroker(url=settings.broker_url)
+
+
+broker = create_broker()
@@ -0,0 +1,148 @@
+import asyncio
+
+from loguru import logger
+from taskiq import TaskiqEvents, TaskiqState
+from dishka import AsyncContainer, make_async_container, Scope
+
+from app.ioc import WorkerProvider
+from app.core.cache import Cache
+from app.core.config import settings
+from app.tasks.broker import broker
+from app.repositories import Repositories
+from app.services.posts import PostsService
+
+
+class LikesBuffer:
+    """Collects like/unlike intents and writes them to db in batches
+
+    Only the last intent of a user for a post is kept. Intents that are
+    still buffered are lost if the worker is killed, acknowledged likes
+    are eventually consistent by design.
+
+    The last intent wins only within one buffer, so exactly one process
+    may consume likes.record: the worker runs with `--workers 1`, and the
+    in-process broker (empty BROKER_URL) is for a single web worker.
+    """
+
+    def __init__(self, batch_size: int, interval: float):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.container: AsyncContainer | None = None
+        self._owns_container = False
+        self._closed = False
+        self._intents: dict[tuple[int, int], bool] = {}
+        self._lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
+
+    def start(self, container: AsyncContainer | None = None):
+        """Writes through container of the process, web app's one with the in-process broker
+
+        A worker has no other container and creates its own, see `WorkerProvider`.
+        """
+
+        self._closed = False
+        if self.container is not None:
+            return
+
+        if container is None:
+            container = make_async_container(WorkerProvider())
+            self._owns_container = True
+
+        self.container = container
+
+    async def add(self, post_id: int, user_id: int, liked: bool):
+        """"""
+
+        self._intents[(user_id, post_id)] = liked
+
+        if len(self._intents) >= self.batch_size:
+            await self.flush()
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flusher is None or self._flusher.done() or self._flusher is asyncio.current_task():
+            self._flusher = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.interval)
+        await self.flush()
+
+    async def flush(self):
+        """"""
+
+        async with self._lock:
+            intents, self._intents = self._intents, {}
+            if not intents:
+                return
+
+            try:
+                await self._write(
+                    liked=[key for key, liked in intents.items() if liked],
+                    disliked=[key for key, liked in intents.items() if not liked],
+                )
+            except Exception as e:
+                logger.exception(f"Failed to flush {len(intents)} like intents: {e}")
+                # keep for the next flush unless a newer intent arrived
+                for key, liked in intents.items():
+                    self._intents.setdefault(key, liked)
+
+                if not self._closed:
+                    self._schedule_flush()
+
+    async def _write(self, liked: list[tuple[int, int]], disliked: list[tuple[int, int]]):
+        if self.container is None:
+            raise RuntimeError("LikesBuffer is not started")
+
+        async with self.container(scope=Scope.REQUEST) as container:
+            repositories = await container.get(Repositories)
+            changed = await repositories.posts().apply_likes(liked=liked, disliked=disliked)
+
+        cache = await self.container.get(Cache)
+        if changed:
+            await cache.invalidate(*[PostsService.cache_key(post_id) for post_id in changed])
+
+        logger.debug(f"Flushed {len(liked)} likes and {len(disliked)} dislikes")
+
+    async def close(self):
+        """"""
+
+        self._closed = True
+        if self._flusher is not None:
+            self._flusher.cancel()
+
+        await self.flush()
+        if self._intents:
+            logger.error(f"{len(self._intents)} like intents are lost on shutdown")
+
+        if self._owns_container:
+            await self.container.close()
+        self.container = None
+        self._owns_container = False
+
+
+likes_buffer = LikesBuffer(
+    batch_size=settings.likes_batch_size,
+    interval=settings.likes_flush_interval,
+)
+
+
+@broker.on_event(TaskiqEvents.WORKER_STARTUP)
+async def start_likes_buffer(state: TaskiqState):
+    """"""
+
+    likes_buffer.start()
+
+
+@broker.on_event(TaskiqEvents.WORKER_SHUTDOWN)
+async def close_likes_buffer(state: TaskiqState):
+    """"""
+
+    await likes_buffer.close()
+
+
+@broker.task(task_name="likes.record")
+async def record_like(post_id: int, user_id: int, liked: bool):
+    """Buffers like intent, see LikesBuffer"""
+
+    await likes_buffer.add(post_id=post_id, user_id=user_id, liked=liked)
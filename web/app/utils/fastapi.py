@@ -1,14 +1,58 @@
+import asyncio
 from typing import AsyncGenerator
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
+from loguru import logger
 from fastapi import FastAPI
 
-from app.db.resources import DatabaseManager
+from app.core.config import settings
+from app.core.cache import CacheManager
+from app.core.metrics import mark_process_dead
+from app.tasks.broker import broker
+from app.tasks.likes import likes_buffer
+from app.db.replicas import ReplicaRouter, REPLICA_STICKY_CHANNEL
+from app.api.dependencies import PRINCIPAL_INVALIDATION_CHANNEL, on_principal_invalidation
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """"""
-    # engine = await DatabaseManager.create_sa_engine().__anext__()
+
+    listeners = []
+    if settings.cache_url:
+        # other workers publish here when they change a user
+        listeners.append(asyncio.create_task(
+            CacheManager.subscribe(
+                channel=PRINCIPAL_INVALIDATION_CHANNEL,
+                handler=on_principal_invalidation,
+            )
+        ))
+
+    if settings.cache_url and settings.replica_urls:
+        # and here when a user writes, to keep their reads on the primary
+        router = await app.state.dishka_container.get(ReplicaRouter)
+        listeners.append(asyncio.create_task(
+            CacheManager.subscribe(
+                channel=REPLICA_STICKY_CHANNEL,
+                handler=router.on_sticky_message,
+            )
+        ))
+
+    if settings.likes_write_behind:
+        if not settings.broker_url and settings.web_concurrency > 1:
+            logger.warning("In-process broker with several web workers, likes of a user may be applied out of order")
+        # with the in-process broker the buffer writes through this app's pool
+        likes_buffer.start(container=app.state.dishka_container)
+        await broker.startup()
+
     yield
-    # await engine.dispose()
+
+    if settings.likes_write_behind:
+        await broker.shutdown()
+
+    for listener in listeners:
+        listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await listener
+
+    mark_process_dead()
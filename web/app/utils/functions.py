@@ -1,5 +1,31 @@
 from datetime import datetime, UTC
 
+from starlette.types import Scope
+
 
 def utcnow() -> datetime:
     return datetime.now(UTC).replace(tzinfo=None)
+
+
+def make_excerpt(text: str, length: int = 280) -> str:
+    """Whitespace-normalized beginning of text cut at a word boundary"""
+
+    text = " ".join(text.split())
+    if len(text) <= length:
+        return text
+
+    return text[:length].rsplit(" ", 1)[0] + "…"
+
+
+def get_route_template(scope: Scope) -> str:
+    """Path template of matched route, set into scope by the router"""
+
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+
+    # plain starlette routes (docs, metrics) set only the endpoint, none of them has parameters
+    if "endpoint" in scope:
+        return scope["path"]
+
+    return "unmatched"
@@ -0,0 +1,286 @@
+"""Concurrent load test of the API with latency percentiles per route
+
+Replays a mix of anonymous and authenticated reads, likes, comments and
+logins. Runs in-process over ASGI (default, app from `application_factory`
+with the database from `.env`) or against a running server with `--url`.
+Results are saved as JSON, `--baseline` compares them with an earlier run.
+
+Usage:
+    `uv run python -m benchmarks.load --duration 30 --concurrency 20`
+    `uv run python -m benchmarks.load --url http://localhost:8001 --baseline benchmarks/results/before.json`
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass, field
+from collections import defaultdict
+
+import httpx
+
+RESULTS_DIR = Path(__file__).parent / "results"
+PASSWORD = "load-test-password"
+
+
+@dataclass
+class Scenario:
+    name: str
+    weight: int
+    authenticated: bool = False
+
+
+# share of requests, roughly what a read-heavy blog sees
+SCENARIOS = [
+    Scenario(name="GET /api/posts/", weight=25),
+    Scenario(name="GET /api/posts/{_id}", weight=20),
+    Scenario(name="GET /api/posts/ (user)", weight=15, authenticated=True),
+    Scenario(name="GET /api/posts/{_id}/comments", weight=10),
+    Scenario(name="GET /api/posts/tags", weight=5),
+    Scenario(name="POST /api/posts/{_id}/like", weight=8, authenticated=True),
+    Scenario(name="DELETE /api/posts/{_id}/like", weight=6, authenticated=True),
+    Scenario(name="POST /api/posts/{_id}/comments", weight=6, authenticated=True),
+    Scenario(name="POST /api/auth/login", weight=5),
+]
+
+
+@dataclass
+class User:
+    email: str
+    token: str
+
+
+@dataclass
+class Results:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def record(self, name: str, started_at: float, response: httpx.Response | None):
+        self.latencies[name].append(time.perf_counter() - started_at)
+        if response is None or response.status_code >= 400:
+            self.errors[name] += 1
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+
+    index = max(int(round(q / 100 * len(values))) - 1, 0)
+
+    return values[min(index, len(values) - 1)]
+
+
+def summarize(latencies: list[float], errors: int, duration: float) -> dict:
+    values = sorted(latencies)
+
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / duration, 2),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+    }
+
+
+async def get_user(client: httpx.AsyncClient, i: int) -> User:
+    """Logs in a load test user, registering it on the first run"""
+
+    email = f"load-test-{i}@example.com"
+
+    response = await client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+    if response.status_code == 400:
+        response = await client.post("/api/auth/register", json={
+            "name": f"Load test {i}",
+            "email": email,
+            "password": PASSWORD,
+            "repeat_password": PASSWORD,
+        })
+    response.raise_for_status()
+
+    return User(email=email, token=response.json()["token"])
+
+
+async def prepare(client: httpx.AsyncClient, users: int, posts: int) -> tuple[list[User], list[int]]:
+    """Users to act as and ids of posts to read, creates posts if there are fewer"""
+
+    accounts = [await get_user(client=client, i=i) for i in range(users)]
+
+    response = await client.get("/api/posts/", params={"limit": 100})
+    response.raise_for_status()
+    post_ids = [post["id"] for post in response.json()["items"]]
+
+    headers = {"Authorization": f"Bearer {accounts[0].token}"}
+    for i in range(len(post_ids), posts):
+        response = await client.post("/api/posts/", headers=headers, json={
+            "title": f"Load test post {i}",
+            "text": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 40,
+            "tags": random.sample(["python", "postgres", "fastapi", "asyncio", "sql", "redis"], k=2),
+        })
+        response.raise_for_status()
+        post_ids.append(response.json()["id"])
+
+    return accounts, post_ids
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    user: User,
+    post_id: int,
+) -> httpx.Response:
+    headers = {"Authorization": f"Bearer {user.token}"} if scenario.authenticated else None
+
+    match scenario.name:
+        case "GET /api/posts/" | "GET /api/posts/ (user)":
+            return await client.get("/api/posts/", params={"limit": 20}, headers=headers)
+        case "GET /api/posts/{_id}":
+            return await client.get(f"/api/posts/{post_id}")
+        case "GET /api/posts/{_id}/comments":
+            return await client.get(f"/api/posts/{post_id}/comments", params={"limit": 20, "offset": 0})
+        case "GET /api/posts/tags":
+            return await client.get("/api/posts/tags", params={"limit": 20})
+        case "POST /api/posts/{_id}/like":
+            return await client.post(f"/api/posts/{post_id}/like", headers=headers)
+        case "DELETE /api/posts/{_id}/like":
+            return await client.delete(f"/api/posts/{post_id}/like", headers=headers)
+        case "POST /api/posts/{_id}/comments":
+            return await client.post(f"/api/posts/{post_id}/comments", headers=headers, json={"text": "Load test comment"})
+        case "POST /api/auth/login":
+            return await client.post("/api/auth/login", json={"email": user.email, "password": PASSWORD})
+
+    raise ValueError(f"Unknown scenario {scenario.name}")
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    users: list[User],
+    post_ids: list[int],
+    deadline: float,
+    results: Results,
+    rng: random.Random,
+):
+    weights = [scenario.weight for scenario in SCENARIOS]
+
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(SCENARIOS, weights=weights)[0]
+        started_at = time.perf_counter()
+        try:
+            response = await run_scenario(
+                client=client,
+                scenario=scenario,
+                user=rng.choice(users),
+                post_id=rng.choice(post_ids),
+            )
+        except httpx.HTTPError:
+            response = None
+        results.record(name=scenario.name, started_at=started_at, response=response)
+
+
+async def load(args: argparse.Namespace, client: httpx.AsyncClient) -> dict:
+    users, post_ids = await prepare(client=client, users=args.users, posts=args.posts)
+
+    results = Results()
+    started = datetime.now()
+    started_at = time.perf_counter()
+    deadline = started_at + args.duration
+    await asyncio.gather(*[
+        worker(
+            client=client,
+            users=users,
+            post_ids=post_ids,
+            deadline=deadline,
+            results=results,
+            rng=random.Random(args.seed + i),
+        )
+        for i in range(args.concurrency)
+    ])
+    duration = time.perf_counter() - started_at
+
+    all_latencies = [value for values in results.latencies.values() for value in values]
+
+    return {
+        "meta": {
+            "started_at": started.isoformat(timespec="seconds"),
+            "target": args.url or "asgi",
+            "duration": round(duration, 2),
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "posts": len(post_ids),
+            "seed": args.seed,
+        },
+        "total": summarize(all_latencies, sum(results.errors.values()), duration),
+        "routes": {
+            name: summarize(latencies, results.errors[name], duration)
+            for name, latencies in sorted(results.latencies.items())
+        },
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    timeout = httpx.Timeout(30.0)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits) as client:
+            return await load(args=args, client=client)
+
+    from app.main import application_factory
+
+    app = application_factory()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        # ASGITransport does not run lifespan
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(base_url="http://load-test", transport=transport, timeout=timeout) as client:
+                return await load(args=args, client=client)
+    finally:
+        await app.state.dishka_container.close()
+
+
+def print_report(report: dict, baseline: dict | None = None):
+    columns = ("requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms")
+    print(f"{'route':<34}" + "".join(f"{column:>12}" for column in columns))
+
+    rows = [*report["routes"].items(), ("total", report["total"])]
+    for name, stats in rows:
+        print(f"{name:<34}" + "".join(f"{stats[column]:>12}" for column in columns))
+
+        before = (baseline or {}).get("routes", {}).get(name) if name != "total" else (baseline or {}).get("total")
+        if before:
+            changes = []
+            for column in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+                if before[column]:
+                    changes.append(f"{(stats[column] - before[column]) / before[column] * 100:+.1f}%")
+                else:
+                    changes.append("-")
+            print(f"{'  vs baseline':<34}" + " " * 24 + "".join(f"{change:>12}" for change in changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="running server, in-process ASGI app when omitted")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=20, help="simultaneous clients")
+    parser.add_argument("--users", type=int, default=10, help="accounts used by authenticated requests")
+    parser.add_argument("--posts", type=int, default=100, help="minimal number of posts to read")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="results file, benchmarks/results/load-<time>.json by default")
+    parser.add_argument("--baseline", type=Path, help="earlier results to compare with")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    print_report(report=report, baseline=baseline)
+
+    output = args.output or RESULTS_DIR / f"load-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nSaved to {output}")
+
+
+if __name__ == "__main__":
+    main()
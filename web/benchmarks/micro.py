@@ -0,0 +1,190 @@
+"""CPU cost of per-request hot paths, tracked over time
+
+Query building and compilation, row to DTO mapping of 100-row pages,
+response serialization and JWT handling. Every run is appended to
+`benchmarks/results/micro.jsonl` with the current commit and compared
+with the previous run, `--check` exits with 1 on regressions.
+
+Usage: `uv run python -m benchmarks.micro [--check] [--threshold 15]`
+"""
+import sys
+import json
+import timeit
+import argparse
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from types import SimpleNamespace
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.utils.functions import utcnow
+from app.mappers.posts import PostMapper
+from app.db.models import PostsModel
+from app.schemas.posts import PostPublic
+from app.schemas.mixins import ResponseItems
+from app.utils.responses import FastJSONResponse, to_public
+from app.repositories.comments import CommentsRepository
+from app.repositories.utils import get_all_query, apply_filters, apply_sorters
+from app.core.security import create_access_token, decode_access_token
+from benchmarks.serialization import make_post
+
+HISTORY = Path(__file__).parent / "results" / "micro.jsonl"
+PAGE_SIZE = 100
+REPEAT = 5
+
+FILTERS = [
+    {"field": "user_id", "operation": "eq", "val": 1},
+    {"field": "likes_count", "operation": "ge", "val": 10},
+]
+SORTERS = [{"field": "id", "order": "desc"}]
+
+DIALECT = asyncpg.dialect()
+
+
+def run_sync(coroutine):
+    """Drives a coroutine that never suspends, without event loop overhead"""
+
+    try:
+        coroutine.send(None)
+    except StopIteration as e:
+        return e.value
+
+    raise RuntimeError("Coroutine suspended, it is not CPU-only")
+
+
+def make_comment(_id: int, post: SimpleNamespace) -> SimpleNamespace:
+    now_ = utcnow()
+
+    return SimpleNamespace(
+        id=_id,
+        created_at=now_,
+        updated_at=now_,
+        text="Nice post, thanks! " * 5,
+        user_id=post.author.id,
+        post_id=post.id,
+        author=post.author,
+        post=post,
+    )
+
+
+def build_posts_query() -> tuple[sa.Select, sa.Select]:
+    return run_sync(
+        get_all_query(
+            model=PostsModel,
+            query=sa.select(PostsModel),
+            limit=20,
+            offset=40,
+            filters=FILTERS,
+            sorters=SORTERS,
+            text_search=("title", "postgres"),
+        )
+    )
+
+
+def get_cases() -> dict:
+    posts = [make_post(_id) for _id in range(PAGE_SIZE)]
+    comments = [make_comment(_id, posts[0]) for _id in range(PAGE_SIZE)]
+    dtos = [PostMapper.to_dto(post, is_liked=False) for post in posts]
+    posts_query, _ = build_posts_query()
+    token = run_sync(create_access_token(minutes=30, payload={"sub": 1}))
+    comments_mapper = getattr(CommentsRepository, "_CommentsRepository__mapper")
+
+    return {
+        "get_all_query": build_posts_query,
+        "apply_filters": lambda: run_sync(
+            apply_filters(query=sa.select(PostsModel), model=PostsModel, filters=FILTERS)
+        ),
+        "apply_sorters": lambda: run_sync(
+            apply_sorters(query=sa.select(PostsModel), model=PostsModel, sorters=SORTERS)
+        ),
+        # what every execution pays on a fresh statement, compiled SQL is then taken from cache
+        "get_all_query + cache key": lambda: build_posts_query()[0]._generate_cache_key(),
+        "statement compile": lambda: posts_query.compile(dialect=DIALECT),
+        f"PostMapper.to_dto x{PAGE_SIZE}": lambda: [PostMapper.to_dto(post, is_liked=False) for post in posts],
+        f"PostMapper.to_list_dto x{PAGE_SIZE}": lambda: [
+            PostMapper.to_list_dto(post, is_liked=False) for post in posts
+        ],
+        f"CommentsRepository mapper x{PAGE_SIZE}": lambda: [comments_mapper(comment=comment) for comment in comments],
+        f"ResponseItems[PostPublic] x{PAGE_SIZE}": lambda: FastJSONResponse(
+            content=ResponseItems[PostPublic].model_construct(
+                count=len(dtos),
+                items=[to_public(PostPublic, dto) for dto in dtos],
+            )
+        ).body,
+        "jwt encode": lambda: run_sync(create_access_token(minutes=30, payload={"sub": 1})),
+        "jwt decode": lambda: run_sync(decode_access_token(token=token)),
+    }
+
+
+def measure(func) -> float:
+    """Best of REPEAT runs in microseconds per call, about 0.2s each"""
+
+    number, _ = timeit.Timer(func).autorange()
+
+    return min(timeit.repeat(func, number=number, repeat=REPEAT)) / number * 1_000_000
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous() -> dict | None:
+    if not HISTORY.exists():
+        return None
+
+    lines = HISTORY.read_text().splitlines()
+
+    return json.loads(lines[-1]) if lines else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="exit with 1 when a case regressed")
+    parser.add_argument("--threshold", type=float, default=15, help="regression threshold, percent")
+    parser.add_argument("--no-save", action="store_true", help="do not append results to the history")
+    args = parser.parse_args()
+
+    previous = load_previous()
+    before = previous["results"] if previous else {}
+
+    results = {}
+    regressions = []
+    for name, func in get_cases().items():
+        results[name] = round(measure(func), 3)
+
+        line = f"{name:<36} {results[name]:>10.2f} us"
+        if name in before:
+            change = (results[name] - before[name]) / before[name] * 100
+            line += f"   {change:+6.1f}% vs {previous['commit'] or 'previous'}"
+            if change > args.threshold:
+                regressions.append(name)
+                line += "   REGRESSION"
+        print(line)
+
+    if not args.no_save:
+        HISTORY.parent.mkdir(parents=True, exist_ok=True)
+        with HISTORY.open("a") as history:
+            history.write(json.dumps({
+                "commit": get_commit(),
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "results": results,
+            }) + "\n")
+
+    if args.check and regressions:
+        print(f"\nRegressed by more than {args.threshold}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""CPU cost of building and rendering response bodies, per endpoint
+
+Compares the previous path (validated DTOs -> FastAPI response_model
+validation -> jsonable_encoder -> json.dumps) with the current one
+(model_construct DTOs -> to_public -> pydantic-core to_json).
+
+Usage: `uv run python -m benchmarks.serialization`
+"""
+import json
+import timeit
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+
+from app.utils.functions import utcnow
+from app.mappers.posts import PostMapper
+from app.schemas.mixins import ResponseItems
+from app.utils.responses import FastJSONResponse, to_public
+from app.schemas.posts import PostDTO, PostListDTO, PostPublic, PostListPublic
+
+PAGE_SIZE = 100
+NUMBER = 200
+
+
+def make_post(_id: int) -> SimpleNamespace:
+    now_ = utcnow()
+
+    return SimpleNamespace(
+        id=_id,
+        created_at=now_,
+        updated_at=now_,
+        text="Lorem ipsum dolor sit amet " * 200,
+        excerpt="Lorem ipsum dolor sit amet " * 10,
+        title=f"Post number {_id}",
+        tags=["python", "postgres", "fastapi"],
+        user_id=1,
+        likes_count=_id * 3,
+        comments_count=_id,
+        search_rank=None,
+        search_headline=None,
+        author=SimpleNamespace(
+            id=1,
+            name="author",
+            email="author@example.com",
+            created_at=now_,
+            updated_at=now_,
+            deleted_at=None,
+        ),
+    )
+
+
+def validated_list_dto(post) -> PostListDTO:
+    return PostListDTO.model_validate(PostMapper.to_list_dto(post, is_liked=False).model_dump())
+
+
+def old_list(posts: list) -> bytes:
+    dtos = [validated_list_dto(post) for post in posts]
+    content = ResponseItems[PostListPublic].model_validate(
+        {"count": len(dtos), "items": dtos},
+        from_attributes=True,
+    )
+    return json.dumps(jsonable_encoder(content)).encode("utf-8")
+
+
+def new_list(posts: list) -> bytes:
+    dtos = [PostMapper.to_list_dto(post, is_liked=False) for post in posts]
+    content = ResponseItems[PostListPublic].model_construct(
+        count=len(dtos),
+        items=[to_public(PostListPublic, dto) for dto in dtos],
+    )
+    return FastJSONResponse(content=content).body
+
+
+def old_detail(post) -> bytes:
+    dto = PostDTO.model_validate(PostMapper.to_dto(post, is_liked=False).model_dump())
+    content = PostPublic.model_validate(dto, from_attributes=True)
+    return json.dumps(jsonable_encoder(content)).encode("utf-8")
+
+
+def new_detail(post) -> bytes:
+    dto = PostMapper.to_dto(post, is_liked=False)
+    return FastJSONResponse(content=to_public(PostPublic, dto)).body
+
+
+def main():
+    posts = [make_post(_id) for _id in range(PAGE_SIZE)]
+
+    cases = {
+        f"GET /api/posts ({PAGE_SIZE} items)": (lambda: old_list(posts), lambda: new_list(posts)),
+        "GET /api/posts/{id}": (lambda: old_detail(posts[0]), lambda: new_detail(posts[0])),
+    }
+
+    for name, (old, new) in cases.items():
+        assert json.loads(old()) == json.loads(new()), name
+
+        old_time = timeit.timeit(old, number=NUMBER) / NUMBER * 1000
+        new_time = timeit.timeit(new, number=NUMBER) / NUMBER * 1000
+        print(f"{name:<32} old {old_time:8.3f} ms   new {new_time:8.3f} ms   x{old_time / new_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""STRUCTURE MIGRATION: add full-text search vector for posts
+
+Revision ID: 5e81b0f3a6d2
+Revises: c2a7e4d19b3f
+Create Date: 2026-10-18 11:37:45.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '5e81b0f3a6d2'
+down_revision: Union[str, None] = 'c2a7e4d19b3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """"""
+
+    # b-tree over full text is useless for search and fails on long posts
+    op.drop_index('idx_posts__text__title', table_name='posts')
+
+    op.add_column(
+        'posts',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(text, '')), 'B')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        'idx_posts__search_vector',
+        'posts',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """"""
+
+    op.drop_index('idx_posts__search_vector', table_name='posts', postgresql_using='gin')
+    op.drop_column('posts', 'search_vector')
+    op.create_index('idx_posts__text__title', 'posts', ['text', 'title'], unique=False)
@@ -0,0 +1,34 @@
+"""STRUCTURE MIGRATION: add import_ids for resolving references of imported rows
+
+Revision ID: 7c1e9a40b5d2
+Revises: e58b17a4c903
+Create Date: 2026-10-18 19:05:41.286315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '7c1e9a40b5d2'
+down_revision: Union[str, None] = 'e58b17a4c903'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """"""
+
+    op.create_table(
+        'import_ids',
+        sa.Column('entity', sa.String(length=16), nullable=False),
+        sa.Column('external_id', sa.String(length=128), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('entity', 'external_id'),
+    )
+
+
+def downgrade() -> None:
+    """"""
+
+    op.drop_table('import_ids')
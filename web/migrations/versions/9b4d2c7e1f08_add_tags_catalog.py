@@ -0,0 +1,49 @@
+"""STRUCTURE MIGRATION: add tags catalog with posts counts
+
+Revision ID: 9b4d2c7e1f08
+Revises: 5e81b0f3a6d2
+Create Date: 2026-10-18 12:24:03.551870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '9b4d2c7e1f08'
+down_revision: Union[str, None] = '5e81b0f3a6d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """"""
+
+    op.create_table(
+        'tags',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('posts_count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.create_index(
+        'idx_tags__posts_count__name',
+        'tags',
+        [sa.text('posts_count DESC'), 'name'],
+        unique=False,
+    )
+
+    op.execute(
+        """
+        INSERT INTO tags (name, posts_count)
+        SELECT tag, count(DISTINCT posts.id)
+        FROM posts, unnest(posts.tags) AS tag
+        GROUP BY tag
+        """
+    )
+
+
+def downgrade() -> None:
+    """"""
+
+    op.drop_index('idx_tags__posts_count__name', table_name='tags')
+    op.drop_table('tags')
@@ -0,0 +1,44 @@
+"""STRUCTURE MIGRATION: add denormalized posts.comments_count
+
+Revision ID: a3e6c08d2b71
+Revises: d7f3a91c5e24
+Create Date: 2026-10-18 15:40:12.608457
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'a3e6c08d2b71'
+down_revision: Union[str, None] = 'd7f3a91c5e24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """"""
+
+    op.add_column(
+        'posts',
+        sa.Column('comments_count', sa.Integer(), server_default='0', nullable=False),
+    )
+
+    op.execute(
+        """
+        UPDATE posts
+        SET comments_count = counts.comments_count
+        FROM (
+            SELECT post_id, count(*) AS comments_count
+            FROM comments
+            GROUP BY post_id
+        ) AS counts
+        WHERE posts.id = counts.post_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """"""
+
+    op.drop_column('posts', 'comments_count')
@@ -0,0 +1,46 @@
+"""STRUCTURE MIGRATION: add denormalized posts.likes_count
+
+Revision ID: c2a7e4d19b3f
+Revises: 80063bb6e43d
+Create Date: 2026-10-18 10:02:11.184233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'c2a7e4d19b3f'
+down_revision: Union[str, None] = '80063bb6e43d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """"""
+
+    op.add_column(
+        'posts',
+        sa.Column('likes_count', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.create_index('idx_likes__post_id', 'likes', ['post_id'], unique=False)
+
+    op.execute(
+        """
+        UPDATE posts
+        SET likes_count = counts.likes_count
+        FROM (
+            SELECT post_id, count(*) AS likes_count
+            FROM likes
+            GROUP BY post_id
+        ) AS counts
+        WHERE posts.id = counts.post_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """"""
+
+    op.drop_index('idx_likes__post_id', table_name='likes')
+    op.drop_column('posts', 'likes_count')
@@ -0,0 +1,33 @@
+"""STRUCTURE MIGRATION: add index for post comments listing
+
+Revision ID: d7f3a91c5e24
+Revises: 9b4d2c7e1f08
+Create Date: 2026-10-18 14:51:29.337810
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'd7f3a91c5e24'
+down_revision: Union[str, None] = '9b4d2c7e1f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """"""
+
+    op.create_index(
+        'idx_comments__post_id__created_at',
+        'comments',
+        ['post_id', sa.text('created_at DESC')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """"""
+
+    op.drop_index('idx_comments__post_id__created_at', table_name='comments')
@@ -0,0 +1,49 @@
+"""STRUCTURE MIGRATION: add posts.excerpt for list responses
+
+Revision ID: e58b17a4c903
+Revises: a3e6c08d2b71
+Create Date: 2026-10-18 16:22:57.014388
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'e58b17a4c903'
+down_revision: Union[str, None] = 'a3e6c08d2b71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+EXCERPT_LENGTH = 280
+
+
+def upgrade() -> None:
+    """"""
+
+    op.add_column(
+        'posts',
+        sa.Column('excerpt', sa.String(), server_default='', nullable=False),
+    )
+
+    # same rules as app.utils.functions.make_excerpt
+    op.execute(
+        f"""
+        UPDATE posts
+        SET excerpt = CASE
+            WHEN length(normalized) <= {EXCERPT_LENGTH} THEN normalized
+            ELSE regexp_replace(left(normalized, {EXCERPT_LENGTH}), ' \\S*$', '') || '…'
+        END
+        FROM (
+            SELECT id, btrim(regexp_replace(text, '\\s+', ' ', 'g')) AS normalized
+            FROM posts
+        ) AS normalized_posts
+        WHERE posts.id = normalized_posts.id
+        """
+    )
+
+
+def downgrade() -> None:
+    """"""
+
+    op.drop_column('posts', 'excerpt')
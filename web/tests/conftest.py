@@ -0,0 +1,11 @@
+import os
+from pathlib import Path
+
+# settings are read from the environment at import, variables missing there come from .env.example
+for line in (Path(__file__).parents[2] / ".env.example").read_text().splitlines():
+    if line and not line.startswith("#") and "=" in line:
+        key, value = line.split("=", 1)
+        os.environ.setdefault(key, value)
+
+# in-process taskiq broker
+os.environ["BROKER_URL"] = ""
@@ -0,0 +1,109 @@
+from datetime import datetime
+
+import bcrypt
+import pytest
+from fastapi import HTTPException, status
+from fastapi.testclient import TestClient
+from dishka import Provider, Scope, make_async_container, provide
+
+from app.api import auth
+from app.core.cache import Cache, MemoryBackend
+from app.main import application_factory
+from app.services import Services
+from app.repositories import Repositories
+from app.schemas.users import UserDTO
+
+PASSWORD = "correct-password"
+
+
+class FakeUsersRepository:
+    def __init__(self, user: UserDTO, updates: list):
+        self.user = user
+        self.updates = updates
+
+    async def get_by_email(self, email: str) -> UserDTO | None:
+        return self.user if email == self.user.email else None
+
+    async def get_by_id(self, _id: int) -> UserDTO | None:
+        return self.user if _id == self.user.id else None
+
+    async def update(self, _id: int, values: dict):
+        self.updates.append((_id, values))
+
+
+class FakeRepositories:
+    def __init__(self, users: FakeUsersRepository):
+        self._users = users
+
+    def users(self) -> FakeUsersRepository:
+        return self._users
+
+
+class FakeProvider(Provider):
+    def __init__(self, users: FakeUsersRepository):
+        super().__init__()
+        self.users = users
+
+    @provide(scope=Scope.REQUEST)
+    def repositories(self) -> Repositories:
+        return FakeRepositories(users=self.users)
+
+    @provide(scope=Scope.APP)
+    def cache(self) -> Cache:
+        return Cache(backend=MemoryBackend(max_size=100), ttl=60)
+
+    services = provide(Services, scope=Scope.REQUEST)
+
+
+@pytest.fixture
+def updates() -> list:
+    return []
+
+
+@pytest.fixture
+def client(updates) -> TestClient:
+    # cheaper cost than settings.bcrypt_rounds, so every login wants a rehash
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=4)).decode()
+    user = UserDTO(
+        id=1,
+        name="User",
+        email="user@example.com",
+        hashed_password=hashed,
+        created_at=datetime(2024, 5, 1),
+        updated_at=datetime(2024, 5, 1),
+        deleted_at=None,
+    )
+
+    app = application_factory()
+    app.state.dishka_container = make_async_container(FakeProvider(users=FakeUsersRepository(user=user, updates=updates)))
+
+    return TestClient(app)
+
+
+def login(client: TestClient):
+    return client.post("/api/auth/login", json={"email": "user@example.com", "password": PASSWORD})
+
+
+def test_login_rehashes_password(client, updates, monkeypatch):
+    async def hash_password(password: str) -> str:
+        return "rehashed"
+
+    monkeypatch.setattr(auth, "hash_password", hash_password)
+
+    response = login(client)
+
+    assert response.status_code == 200
+    assert updates == [(1, {"hashed_password": "rehashed"})]
+
+
+def test_busy_hashing_pool_does_not_reject_login(client, updates, monkeypatch):
+    async def hash_password(password: str) -> str:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server is busy")
+
+    monkeypatch.setattr(auth, "hash_password", hash_password)
+
+    response = login(client)
+
+    assert response.status_code == 200
+    assert response.json()["token"]
+    assert updates == []
@@ -0,0 +1,97 @@
+import asyncio
+
+from pydantic import BaseModel
+
+from app.core.cache import Cache, MemoryBackend
+
+
+class Item(BaseModel):
+    value: str
+
+
+async def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_size=2)
+
+    await backend.set("a", "1", ttl=60)
+    await backend.set("b", "2", ttl=60)
+    await backend.get("a")
+    await backend.set("c", "3", ttl=60)
+
+    assert list(backend.values) == ["a", "c"]
+
+
+async def test_memory_backend_sweeps_expired():
+    backend = MemoryBackend(max_size=100, sweep_interval=0)
+
+    await backend.set("a", "1", ttl=0)
+    await backend.set("b", "2", ttl=60)
+
+    assert list(backend.values) == ["b"]
+
+
+async def test_generations_are_dropped_after_flight():
+    cache = Cache(backend=MemoryBackend(max_size=100), ttl=60)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def loader() -> Item:
+        started.set()
+        await release.wait()
+        return Item(value="stale")
+
+    load = asyncio.create_task(cache.get_or_load(key="k", schema=Item, loader=loader))
+    await started.wait()
+
+    await cache.invalidate("k", "other")
+    assert cache._generations == {"k": 1}
+
+    release.set()
+    assert (await load).value == "stale"
+
+    # invalidated while loading, so not stored
+    assert await cache.backend.get("k") is None
+    assert cache._generations == {}
+    assert cache._flights == {}
+
+
+async def test_waiter_loads_itself_when_owner_is_cancelled():
+    cache = Cache(backend=MemoryBackend(max_size=100), ttl=60)
+    started = asyncio.Event()
+    loads = []
+
+    async def owner_loader() -> Item:
+        loads.append("owner")
+        started.set()
+        await asyncio.sleep(60)
+
+    async def waiter_loader() -> Item:
+        loads.append("waiter")
+        return Item(value="fresh")
+
+    owner = asyncio.create_task(cache.get_or_load(key="k", schema=Item, loader=owner_loader))
+    await started.wait()
+    waiter = asyncio.create_task(cache.get_or_load(key="k", schema=Item, loader=waiter_loader))
+    await asyncio.sleep(0)
+
+    owner.cancel()
+
+    assert (await waiter).value == "fresh"
+    assert owner.cancelled()
+    assert loads == ["owner", "waiter"]
+
+
+async def test_waiters_share_the_flight():
+    cache = Cache(backend=MemoryBackend(max_size=100), ttl=60)
+    loads = []
+
+    async def loader() -> Item:
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return Item(value="shared")
+
+    results = await asyncio.gather(*[
+        cache.get_or_load(key="k", schema=Item, loader=loader) for _ in range(5)
+    ])
+
+    assert [result.value for result in results] == ["shared"] * 5
+    assert loads == [1]
@@ -0,0 +1,227 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from dishka import Provider, Scope, make_async_container, provide
+
+from app.main import application_factory
+from app.services import Services
+from app.core.cache import Cache, MemoryBackend
+from app.repositories import Repositories
+from app.services.users import UsersService
+from app.schemas.users import UserDTO
+from app.schemas.comments import CommentDTO, CommentUser, CommentPost
+
+UPDATED_AT = datetime(2024, 5, 1, 10, 0, 0, 123)
+
+
+def make_user(name: str, updated_at: datetime = UPDATED_AT) -> UserDTO:
+    return UserDTO(
+        id=1,
+        name=name,
+        email="author@example.com",
+        hashed_password="",
+        created_at=UPDATED_AT,
+        updated_at=updated_at,
+        deleted_at=None,
+    )
+
+
+def make_comment(_id: int, updated_at: datetime) -> CommentDTO:
+    user = CommentUser(id=1, name="Author", email="author@example.com", created_at=UPDATED_AT, updated_at=UPDATED_AT)
+
+    return CommentDTO(
+        id=_id,
+        created_at=UPDATED_AT,
+        updated_at=updated_at,
+        text="Nice post",
+        user_id=user.id,
+        post_id=2,
+        author=user,
+        post=CommentPost(id=2, user_id=user.id, author=user, created_at=UPDATED_AT, updated_at=UPDATED_AT),
+    )
+
+
+class FakeCommentsRepository:
+    def __init__(self, comments: dict[int, CommentDTO], loads: list):
+        self.comments = comments
+        self.loads = loads
+
+    async def get_version(self, _id: int) -> tuple[datetime, ...] | None:
+        comment = self.comments.get(_id)
+        if comment is None:
+            return None
+
+        return comment.updated_at, comment.author.updated_at, comment.post.updated_at, comment.post.author.updated_at
+
+    async def get_by_id(self, _id: int) -> CommentDTO | None:
+        self.loads.append(_id)
+
+        return self.comments.get(_id)
+
+
+class FakeUsersRepository:
+    def __init__(self, users: dict[int, UserDTO]):
+        self.users = users
+
+    async def get_by_id(self, _id: int) -> UserDTO | None:
+        return self.users.get(_id)
+
+
+class FakePostsRepository:
+    def __init__(self, users: dict[int, UserDTO]):
+        self.users = users
+
+    async def get_by_id(self, _id: int, user_id: int | None = None) -> SimpleNamespace | None:
+        if _id != 1:
+            return None
+
+        return SimpleNamespace(
+            id=_id,
+            created_at=UPDATED_AT,
+            updated_at=UPDATED_AT,
+            text="Post text",
+            title="Post",
+            tags=["python"],
+            user_id=1,
+            likes_count=0,
+            comments_count=0,
+            is_liked=False,
+            author=self.users[1],
+        )
+
+
+class FakeRepositories:
+    def __init__(self, comments: FakeCommentsRepository, users: dict[int, UserDTO]):
+        self._comments = comments
+        self._users = users
+
+    def read(self, user_id: int | None = None) -> "FakeRepositories":
+        return self
+
+    def comments(self) -> FakeCommentsRepository:
+        return self._comments
+
+    def users(self) -> FakeUsersRepository:
+        return FakeUsersRepository(users=self._users)
+
+    def posts(self) -> FakePostsRepository:
+        return FakePostsRepository(users=self._users)
+
+
+class FakeProvider(Provider):
+    def __init__(self, comments: FakeCommentsRepository, users: dict[int, UserDTO], cache: Cache):
+        super().__init__()
+        self.comments = comments
+        self.users = users
+        self.cache = cache
+
+    @provide(scope=Scope.REQUEST)
+    def repositories(self) -> Repositories:
+        return FakeRepositories(comments=self.comments, users=self.users)
+
+    @provide(scope=Scope.APP)
+    def get_cache(self) -> Cache:
+        return self.cache
+
+    services = provide(Services, scope=Scope.REQUEST)
+
+
+@pytest.fixture
+def loads() -> list:
+    return []
+
+
+@pytest.fixture
+def comments() -> dict:
+    return {1: make_comment(_id=1, updated_at=UPDATED_AT)}
+
+
+@pytest.fixture
+def users() -> dict:
+    return {1: make_user(name="Author")}
+
+
+@pytest.fixture
+def cache() -> Cache:
+    return Cache(backend=MemoryBackend(max_size=100), ttl=60)
+
+
+@pytest.fixture
+def client(comments, loads, users, cache) -> TestClient:
+    app = application_factory()
+    app.state.dishka_container = make_async_container(
+        FakeProvider(comments=FakeCommentsRepository(comments=comments, loads=loads), users=users, cache=cache)
+    )
+
+    return TestClient(app)
+
+
+def test_comment_has_validators(client, loads):
+    response = client.get("/api/comments/1")
+
+    assert response.status_code == 200
+    assert response.json()["text"] == "Nice post"
+    assert response.headers["etag"].startswith('"')
+    assert response.headers["last-modified"] == "Wed, 01 May 2024 10:00:00 GMT"
+    assert loads == [1]
+
+
+def test_matching_etag_skips_loading(client, loads):
+    etag = client.get("/api/comments/1").headers["etag"]
+
+    response = client.get("/api/comments/1", headers={"If-None-Match": f'"other", W/{etag}'})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+    assert loads == [1]
+
+
+def test_if_modified_since(client, loads):
+    response = client.get("/api/comments/1", headers={"If-Modified-Since": "Wed, 01 May 2024 10:00:00 GMT"})
+    assert response.status_code == 304
+
+    response = client.get("/api/comments/1", headers={"If-Modified-Since": "Wed, 01 May 2024 09:59:59 GMT"})
+    assert response.status_code == 200
+
+    # If-None-Match takes precedence
+    response = client.get("/api/comments/1", headers={
+        "If-None-Match": '"other"',
+        "If-Modified-Since": "Wed, 01 May 2024 10:00:00 GMT",
+    })
+    assert response.status_code == 200
+
+    assert loads == [1, 1]
+
+
+def test_changed_comment_gets_new_etag(client, comments):
+    etag = client.get("/api/comments/1").headers["etag"]
+
+    comments[1] = make_comment(_id=1, updated_at=datetime(2024, 5, 2))
+    response = client.get("/api/comments/1", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_missing_comment(client):
+    assert client.get("/api/comments/2").status_code == 404
+
+
+def test_post_etag_follows_author_rename(client, users, cache):
+    response = client.get("/api/posts/1")
+    etag = response.headers["etag"]
+    assert response.headers["vary"] == "Authorization"
+    assert client.get("/api/posts/1", headers={"If-None-Match": etag}).status_code == 304
+
+    # what update_me does, the cached post itself is not invalidated
+    users[1] = make_user(name="Renamed", updated_at=datetime(2024, 5, 2))
+    asyncio.run(cache.invalidate(UsersService.cache_key(1)))
+
+    response = client.get("/api/posts/1", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
@@ -0,0 +1,22 @@
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import Settings
+
+
+@pytest.mark.parametrize("variable", ["COUNT_STRATEGY", "LIST_FETCH_MODE", "QUERY_BUDGET_MODE"])
+def test_invalid_mode_fails_at_load(monkeypatch, variable):
+    monkeypatch.setenv(variable, "bogus")
+
+    with pytest.raises(ValidationError):
+        Settings()
+
+
+def test_valid_modes(monkeypatch):
+    monkeypatch.setenv("COUNT_STRATEGY", "estimated")
+    monkeypatch.setenv("LIST_FETCH_MODE", "window")
+    monkeypatch.setenv("QUERY_BUDGET_MODE", "raise")
+
+    settings = Settings()
+
+    assert (settings.count_strategy, settings.list_fetch_mode, settings.query_budget_mode) == ("estimated", "window", "raise")
@@ -0,0 +1,207 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+import pytest
+from dishka import Provider, Scope, make_async_container, provide
+
+from app.core.cache import Cache
+from app.core.config import settings
+from app.main import application_factory
+from app.services import Services
+from app.schemas.posts import PostDTO
+from app.schemas.users import UserPublic
+from app.api.dependencies import get_current_user
+from app.repositories import Repositories
+from app.services.posts import PostsService
+from app.tasks.broker import broker
+from app.tasks.likes import likes_buffer, record_like
+
+
+class FakePostsRepository:
+    def __init__(self, calls: list, failures: list):
+        self.calls = calls
+        self.failures = failures
+
+    async def apply_likes(self, liked: list[tuple[int, int]], disliked: list[tuple[int, int]]) -> set[int]:
+        if self.failures:
+            raise self.failures.pop()
+
+        self.calls.append((sorted(liked), sorted(disliked)))
+
+        return {post_id for _, post_id in liked + disliked}
+
+
+class FakeRepositories:
+    def __init__(self, calls: list, failures: list):
+        self._posts = FakePostsRepository(calls=calls, failures=failures)
+
+    def posts(self) -> FakePostsRepository:
+        return self._posts
+
+
+class FakeCache:
+    def __init__(self):
+        self.invalidated = []
+
+    async def invalidate(self, *keys: str):
+        self.invalidated.extend(keys)
+
+
+class FakeProvider(Provider):
+    def __init__(self, calls: list, failures: list, cache: FakeCache):
+        super().__init__()
+        self.calls = calls
+        self.failures = failures
+        self.cache = cache
+
+    @provide(scope=Scope.REQUEST)
+    def repositories(self) -> Repositories:
+        return FakeRepositories(calls=self.calls, failures=self.failures)
+
+    @provide(scope=Scope.APP)
+    def get_cache(self) -> Cache:
+        return self.cache
+
+
+@pytest.fixture
+def calls() -> list:
+    return []
+
+
+@pytest.fixture
+def failures() -> list:
+    return []
+
+
+@pytest.fixture
+def cache() -> FakeCache:
+    return FakeCache()
+
+
+@pytest.fixture
+async def started_broker(calls, failures, cache):
+    container = make_async_container(FakeProvider(calls=calls, failures=failures, cache=cache))
+    likes_buffer.batch_size = 100
+    likes_buffer.interval = 60
+
+    likes_buffer.start(container=container)
+    await broker.startup()
+
+    yield broker
+
+    await likes_buffer.close()
+    await container.close()
+
+
+async def record(post_id: int, user_id: int, liked: bool):
+    task = await record_like.kiq(post_id=post_id, user_id=user_id, liked=liked)
+    result = await task.wait_result(timeout=5)
+    assert not result.is_err
+
+
+async def test_last_intent_wins(started_broker, calls, cache):
+    await record(post_id=1, user_id=10, liked=True)
+    await record(post_id=1, user_id=10, liked=False)
+    await record(post_id=2, user_id=10, liked=False)
+    await record(post_id=2, user_id=10, liked=True)
+
+    await likes_buffer.flush()
+
+    assert calls == [([(10, 2)], [(10, 1)])]
+    assert sorted(cache.invalidated) == [PostsService.cache_key(1), PostsService.cache_key(2)]
+
+
+async def test_failed_flush_is_retried(started_broker, calls, failures):
+    likes_buffer.interval = 0.01
+    failures.append(ConnectionError("database is down"))
+
+    await record(post_id=1, user_id=10, liked=True)
+    await asyncio.sleep(0.2)
+
+    # the first scheduled flush failed and scheduled another one
+    assert failures == []
+    assert calls == [([(10, 1)], [])]
+
+
+async def test_failed_flush_keeps_newer_intent(started_broker, calls, failures):
+    failures.append(ConnectionError("database is down"))
+
+    await record(post_id=1, user_id=10, liked=True)
+    write = asyncio.create_task(likes_buffer.flush())
+    await asyncio.sleep(0)
+    await record(post_id=1, user_id=10, liked=False)
+    await write
+
+    await likes_buffer.flush()
+
+    assert calls == [([], [(10, 1)])]
+
+
+async def test_shutdown_flushes_buffer(started_broker, calls):
+    await record(post_id=1, user_id=10, liked=True)
+    await record(post_id=3, user_id=12, liked=False)
+
+    await broker.shutdown()
+
+    assert calls == [([(10, 1)], [(12, 3)])]
+    assert likes_buffer.container is None
+
+
+class FakePostsService:
+    """Post as read from db and cache, which never sees buffered intents"""
+
+    async def get_by_id(self, _id: int, user_id: int | None) -> PostDTO:
+        now_ = datetime(2024, 5, 1)
+        author = UserPublic(id=1, name="Author", email="author@example.com", created_at=now_, updated_at=now_)
+
+        return PostDTO(
+            id=_id,
+            created_at=now_,
+            updated_at=now_,
+            text="Post text",
+            title="Post",
+            user_id=author.id,
+            is_liked=False,
+            tags=[],
+            author=author,
+            likes_count=0,
+            comments_count=0,
+        )
+
+
+class FakeServices:
+    def posts(self) -> FakePostsService:
+        return FakePostsService()
+
+
+class FakeServicesProvider(Provider):
+    @provide(scope=Scope.REQUEST)
+    def services(self) -> Services:
+        return FakeServices()
+
+
+async def test_unlike_before_flush_wins(started_broker, calls, monkeypatch):
+    monkeypatch.setattr(settings, "likes_write_behind", True)
+    app = application_factory()
+    app.state.dishka_container = make_async_container(FakeServicesProvider())
+    app.dependency_overrides[get_current_user] = lambda: UserPublic(
+        id=10, name="User", email="user@example.com", created_at=datetime(2024, 5, 1), updated_at=datetime(2024, 5, 1),
+    )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        liked = await client.post("/api/posts/1/like")
+        assert liked.json()["is_liked"] is True
+        assert liked.json()["likes_count"] == 1
+
+        # the stored post is still not liked, the like is only buffered
+        disliked = await client.delete("/api/posts/1/like")
+        assert disliked.json()["is_liked"] is False
+        assert disliked.json()["likes_count"] == 0
+
+    await app.state.dishka_container.close()
+    await asyncio.sleep(0.05)
+    await likes_buffer.flush()
+
+    assert calls == [([], [(10, 1)])]
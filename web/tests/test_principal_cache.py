@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import pytest
+
+from app.schemas.users import UserDTO
+from app.core.metrics import PRINCIPAL_CACHE_REQUESTS, PRINCIPAL_CACHE_SIZE
+from app.api.dependencies import PrincipalCache, principal_cache, on_principal_invalidation
+
+
+def make_user(_id: int) -> UserDTO:
+    now_ = datetime(2024, 5, 1)
+
+    return UserDTO(
+        id=_id,
+        name="User",
+        email=f"user{_id}@example.com",
+        hashed_password="",
+        created_at=now_,
+        updated_at=now_,
+        deleted_at=None,
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+def test_invalidation_message():
+    principal_cache.set(user_id=1, token="a", user=make_user(1))
+    principal_cache.set(user_id=2, token="b", user=make_user(2))
+
+    on_principal_invalidation("1")
+
+    assert principal_cache.get(user_id=1, token="a") is None
+    assert principal_cache.get(user_id=2, token="b") is not None
+
+
+def test_malformed_invalidation_message_is_ignored():
+    principal_cache.set(user_id=1, token="a", user=make_user(1))
+
+    on_principal_invalidation("not-an-id")
+
+    assert principal_cache.get(user_id=1, token="a") is not None
+
+
+def test_metrics():
+    cache = PrincipalCache(max_size=1, ttl=60)
+    hits = PRINCIPAL_CACHE_REQUESTS.labels(result="hit")._value.get()
+    misses = PRINCIPAL_CACHE_REQUESTS.labels(result="miss")._value.get()
+
+    cache.set(user_id=1, token="a", user=make_user(1))
+    cache.set(user_id=2, token="b", user=make_user(2))
+    assert PRINCIPAL_CACHE_SIZE._value.get() == 1
+
+    assert cache.get(user_id=1, token="a") is None
+    assert cache.get(user_id=2, token="b") is not None
+
+    assert PRINCIPAL_CACHE_REQUESTS.labels(result="hit")._value.get() == hits + 1
+    assert PRINCIPAL_CACHE_REQUESTS.labels(result="miss")._value.get() == misses + 1